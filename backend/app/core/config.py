@@ -0,0 +1,97 @@
+"""
+Configurações da aplicação
+"""
+import os
+
+# Banco de dados SQLite e ajustes do pool de conexões
+DB_FILE = os.getenv("DB_FILE", "coordinates.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", str(64 * 1024)))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+# Número de PDFs processados em paralelo pela fila de jobs em segundo plano
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Tempo (em segundos) que um job finalizado permanece disponível para consulta
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+# Número de processos usados para renderizar as páginas de um PDF (1 = serial)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "1"))
+
+# Diretório para armazenar arquivos processados; com STORAGE_BACKEND=s3 é só a área local
+# onde o upload é gravado e rasterizado antes de ser enviado ao bucket
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/app/uploads")  # Caminho absoluto no container
+
+# Armazenamento dos PDFs e das páginas pré-renderizadas: "local" (UPLOAD_DIR) ou "s3" (bucket
+# compatível com S3, ex.: MinIO, compartilhado entre réplicas; lido através do cache de
+# renderização local). Com STORAGE_REDIRECT_DOWNLOADS, as páginas guardadas no bucket são
+# entregues por redirecionamento para uma URL pré-assinada em vez de passar pelo backend
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+S3_PRESIGN_EXPIRES_SECONDS = int(os.getenv("S3_PRESIGN_EXPIRES_SECONDS", "3600"))
+STORAGE_REDIRECT_DOWNLOADS = os.getenv("STORAGE_REDIRECT_DOWNLOADS", "false").lower() in ("1", "true", "yes")
+
+# Tamanho dos blocos lidos/gravados ao receber um upload
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# "eager" renderiza todas as páginas no upload; "lazy" renderiza cada página no primeiro acesso
+RENDER_MODE = os.getenv("RENDER_MODE", "eager")
+
+# Cache em disco das páginas renderizadas sob demanda (com descarte LRU)
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "/app/render-cache")
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Tamanho (em pixels) dos tiles da pirâmide de zoom
+TILE_SIZE = int(os.getenv("TILE_SIZE", "256"))
+
+# Perfis de renderização de página; perfis sem "dpi" usam a resolução completa (300 DPI)
+# e perfis com "max_size" são reduzidos até o maior lado caber nesse tamanho (em pixels)
+RENDER_PROFILES = {
+    "full": {"format": "png"},
+    "preview": {
+        "dpi": int(os.getenv("PREVIEW_DPI", "96")),
+        "format": "jpeg",
+        "quality": int(os.getenv("PREVIEW_QUALITY", "80"))
+    },
+    "thumbnail": {
+        "max_size": int(os.getenv("THUMBNAIL_MAX_SIZE", "256")),
+        "format": "jpeg",
+        "quality": int(os.getenv("THUMBNAIL_QUALITY", "75"))
+    },
+}
+
+# Perfis renderizados no upload quando o cliente não escolhe; vazio = tudo sob demanda
+INGEST_PROFILES = [
+    profile for profile in os.getenv("INGEST_PROFILES", "full,thumbnail" if RENDER_MODE == "eager" else "").split(",")
+    if profile
+]
+
+# Linhas lidas do banco por bloco durante as exportações em streaming
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+# Cache em memória das respostas de /history, /image-info e /coordinates/{image_id}
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+
+# Logging estruturado: nível, formato (json ou text), fração das requisições com linhas de
+# debug registradas, tamanho da fila (registros excedentes são descartados) e o tempo a partir
+# do qual uma requisição é registrada como lenta (WARNING)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+
+# Retenção das sessões de upload (PDF + páginas renderizadas): coleta de lixo periódica
+# (intervalo em segundos, 0 desliga a thread), idade máxima em dias e total máximo de bytes
+# em UPLOAD_DIR (0 = sem limite). Sessões com coordenadas salvas são mantidas (só as páginas
+# pré-renderizadas são apagadas) e diretórios órfãos só são removidos após a carência
+STORAGE_GC_INTERVAL_SECONDS = int(os.getenv("STORAGE_GC_INTERVAL_SECONDS", "3600"))
+STORAGE_RETENTION_DAYS = float(os.getenv("STORAGE_RETENTION_DAYS", "0"))
+STORAGE_MAX_BYTES = int(os.getenv("STORAGE_MAX_BYTES", "0"))
+STORAGE_KEEP_WITH_COORDINATES = os.getenv("STORAGE_KEEP_WITH_COORDINATES", "true").lower() in ("1", "true", "yes")
+STORAGE_ORPHAN_GRACE_SECONDS = int(os.getenv("STORAGE_ORPHAN_GRACE_SECONDS", "3600"))
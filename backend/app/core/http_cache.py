@@ -0,0 +1,98 @@
+"""
+Cache HTTP de arquivos imutáveis (páginas renderizadas e tiles).
+
+O ETag é derivado da identidade do recurso (sessão, página, perfil e parâmetros de
+renderização), não do arquivo em disco: o mesmo recurso tem sempre o mesmo ETag, mesmo
+depois de ser descartado do cache de renderização e gerado de novo, e um If-None-Match
+pode ser respondido com 304 sem renderizar nada.
+"""
+import hashlib
+import os
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+# Recursos de uma sessão nunca mudam: o navegador e o nginx podem guardá-los por um ano
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+def make_etag(*parts):
+    """ETag forte a partir da identidade do recurso"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+def _cache_headers(etag):
+    return {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+def not_modified(request: Request, etag):
+    """Retorna uma resposta 304 se o cliente já tem a versão com esse ETag, senão None"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match usa comparação fraca: W/"x" casa com "x"
+    if "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return None
+
+def _parse_range(range_header, size):
+    """Interpreta um Range de intervalo único; retorna (início, fim) ou None se não for satisfazível"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError("Range não suportado")
+    start, _, end = spec.strip().partition("-")
+    if not start:
+        # Sufixo: os últimos N bytes
+        length = int(end)
+        if length <= 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+def _iter_file_range(path, start, end):
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def cached_file_response(request: Request, path, media_type, etag):
+    """Serve um arquivo imutável com ETag, Cache-Control, 304 e requisições Range (206)"""
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    headers = {**_cache_headers(etag), "Accept-Ranges": "bytes"}
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # Com If-Range, o intervalo só vale se o cliente ainda tiver a mesma versão
+    if range_header and (not if_range or if_range == etag):
+        size = os.path.getsize(path)
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            byte_range = ()
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            return StreamingResponse(
+                _iter_file_range(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers={
+                    **headers,
+                    "Content-Range": f"bytes {start}-{end}/{size}",
+                    "Content-Length": str(end - start + 1)
+                }
+            )
+
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -0,0 +1,34 @@
+"""
+Serialização JSON rápida para respostas grandes (listas de coordenadas).
+
+Usa o orjson quando instalado, com o json da biblioteca padrão como alternativa. As linhas
+chegam como tuplas direto do cursor e são serializadas sem passar pelo jsonable_encoder.
+"""
+import json
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Formatos de resposta das listagens: lista de objetos (padrão) ou colunas + linhas em arrays
+ROW_FORMATS = ("objects", "compact")
+
+def dumps(content):
+    """Serializa o conteúdo em bytes JSON"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_bytes_response(content):
+    return Response(content=dumps(content), media_type="application/json")
+
+def rows_response(columns, rows, row_format="objects"):
+    """
+    Resposta JSON de uma consulta: uma lista de objetos ou, no formato compact,
+    {"columns": [...], "rows": [[...], ...]} sem repetir os nomes das colunas a cada linha
+    """
+    if row_format == "compact":
+        return json_bytes_response({"columns": columns, "rows": rows})
+    return json_bytes_response([dict(zip(columns, row)) for row in rows])
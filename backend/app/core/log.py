@@ -0,0 +1,171 @@
+"""
+Logging estruturado e não bloqueante.
+
+Quem registra só resolve a mensagem e enfileira o registro (QueueHandler); uma thread
+(QueueListener) formata em JSON e escreve em stdout. Com a fila cheia o registro é descartado
+e contado, em vez de segurar a requisição. As linhas de debug por requisição são amostradas
+(LOG_SAMPLE_RATE, sorteado uma vez por requisição) e, com o debug desligado, custam uma
+comparação de nível.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from .config import LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE, LOG_QUEUE_SIZE, LOG_SLOW_REQUEST_MS
+from .metrics import Counter
+
+# Logger raiz da aplicação ("app"); os módulos usam logging.getLogger(__name__)
+APP_LOGGER_NAME = __name__.rsplit(".core.", 1)[0]
+
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Registros de log descartados com a fila cheia")
+
+# Contexto da requisição atual: id e se as linhas de debug dela são registradas
+_request_id = contextvars.ContextVar("request_id", default=None)
+_sampled = contextvars.ContextVar("log_sampled", default=True)
+
+# Atributos próprios do LogRecord; o resto veio de extra= e vira campo do JSON
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos passados em extra="""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.request_id:
+            entry["request_id"] = record.request_id
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento: campos extras como chave=valor"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if record.request_id:
+            fields = {"request_id": record.request_id, **fields}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Roda na thread de quem registrou: só o que depende dela (mensagem, exceção, contexto)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = _request_id.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+_listener = None
+
+def setup_logging():
+    """Configura o logger da aplicação com a fila e a thread de escrita (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    # Ao encerrar, escreve o que ainda estiver na fila
+    atexit.register(_listener.stop)
+
+    app_logger = logging.getLogger(APP_LOGGER_NAME)
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(_NonBlockingQueueHandler(log_queue))
+    app_logger.propagate = False
+
+def debug_sampled(logger, msg, *args, **fields):
+    """Linha de debug por requisição: só é montada com o debug ligado e a requisição amostrada"""
+    if logger.isEnabledFor(logging.DEBUG) and _sampled.get():
+        logger.debug(msg, *args, extra=fields)
+
+access_logger = logging.getLogger(f"{APP_LOGGER_NAME}.access")
+
+class RequestLoggingMiddleware:
+    """
+    Middleware ASGI que dá um id a cada requisição (X-Request-ID, aceito do cliente ou gerado),
+    sorteia se as linhas de debug dela são registradas e registra método, rota, status e
+    duração: em WARNING para erros 5xx e requisições lentas, em debug (amostrado) para o resto
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        request_id_token = _request_id.set(request_id)
+        sampled_token = _sampled.set(access_logger.isEnabledFor(logging.DEBUG) and random.random() < LOG_SAMPLE_RATE)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if status >= 500 or duration_ms >= LOG_SLOW_REQUEST_MS:
+                route = scope.get("route")
+                access_logger.warning(
+                    "%s %s %s", scope["method"], scope["path"], status,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route.path if route is not None else None,
+                        "status": status,
+                        "duration_ms": round(duration_ms, 2)
+                    }
+                )
+            else:
+                debug_sampled(
+                    access_logger, "%s %s %s", scope["method"], scope["path"], status,
+                    method=scope["method"], path=scope["path"], status=status, duration_ms=round(duration_ms, 2)
+                )
+            _sampled.reset(sampled_token)
+            _request_id.reset(request_id_token)
@@ -0,0 +1,164 @@
+"""
+Métricas da aplicação no formato de texto do Prometheus.
+
+Implementação mínima (contadores, gauges e histogramas com labels) para não depender do
+prometheus_client. Os valores são por processo; com vários workers, cada um expõe os seus.
+"""
+import bisect
+import threading
+import time
+
+# Limites (em segundos) padrão dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Valor que só aumenta (ex.: total de requisições)"""
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+class Gauge(Counter):
+    """Valor que sobe e desce (ex.: requisições em andamento)"""
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    """Distribuição de valores em faixas cumulativas, com soma e contagem"""
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labels):
+        """Context manager que observa a duração do bloco"""
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+        lines = self._header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+REGISTRY = []
+
+def render_metrics():
+    """Todas as métricas registradas no formato de texto do Prometheus"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Requisições HTTP
+HTTP_REQUESTS = Counter("http_requests_total", "Requisições HTTP atendidas", ("method", "route", "status"))
+HTTP_REQUEST_DURATION = Histogram("http_request_duration_seconds", "Latência das requisições HTTP (até o fim da resposta)", ("method", "route"))
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "Requisições HTTP em andamento")
+
+# Banco de dados
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Duração das queries SQLite (incluindo a espera por uma conexão do pool)", ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+# Renderização de páginas
+PAGE_RENDER_DURATION = Histogram("pdf_page_render_seconds", "Tempo de renderização de uma página por perfil", ("profile",))
+PAGE_RENDER_BYTES = Counter("pdf_page_render_bytes_total", "Bytes de imagem gerados na renderização de páginas", ("profile",))
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede latência, status e requisições em andamento por rota"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+        HTTP_IN_PROGRESS.inc()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            # O template da rota (ex.: /coordinates/{image_id}) evita uma série por URL
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, scope["method"], route_path)
+            HTTP_REQUESTS.inc(scope["method"], route_path, str(status))
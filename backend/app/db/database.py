@@ -1,26 +1,91 @@
+import asyncio
+import functools
+import queue
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 import os
+from .migrations import migrate
+from ..core.metrics import DB_QUERY_DURATION
+from ..core.config import DB_FILE, DB_POOL_SIZE, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_STATEMENT_CACHE_SIZE
 
-DB_FILE = "coordinates.db"
+class ConnectionPool:
+    """Pool de conexões SQLite reutilizáveis, configuradas com WAL e pragmas de desempenho"""
+
+    def __init__(self, db_file, size):
+        self.db_file = db_file
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # cached_statements mantém os statements preparados de cada conexão para reuso
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, cached_statements=DB_STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        # WAL permite leituras concorrentes com uma escrita; synchronous=NORMAL é seguro com WAL
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def acquire(self):
+        """Obtém uma conexão livre, criando uma nova enquanto o pool não estiver cheio"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._connect()
+        return self._idle.get()
+
+    def release(self, conn):
+        """Devolve a conexão ao pool, descartando transações não finalizadas"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Retorna o pool de conexões do processo, criando-o no primeiro uso"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_FILE, DB_POOL_SIZE)
+    return _pool
 
 @contextmanager
 def get_db_connection():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    pool = get_pool()
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+def _operation(query):
+    """Tipo do statement (SELECT, INSERT...), usado como label das métricas"""
+    return query.lstrip().split(None, 1)[0].upper()
 
 def execute_db_query(query, params=(), fetch_one=False, fetch_all=False, commit=False):
-    with get_db_connection() as conn:
+    with DB_QUERY_DURATION.time(_operation(query)), get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, params)
         
         if commit:
+            # Com RETURNING, a linha retornada é lida antes do commit
+            row = cursor.fetchone() if fetch_one else None
             conn.commit()
-            return cursor.lastrowid
+            return row if fetch_one else cursor.lastrowid
         
         if fetch_one:
             return cursor.fetchone()
@@ -30,53 +95,33 @@ def execute_db_query(query, params=(), fetch_one=False, fetch_all=False, commit=
         
         return None
 
+def execute_db_query_tuples(query, params=()):
+    """Executa uma consulta e retorna (colunas, linhas) com as linhas como tuplas, sem sqlite3.Row"""
+    with DB_QUERY_DURATION.time(_operation(query)), get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        return [column[0] for column in cursor.description], rows
+
+# Executor dedicado às queries dos handlers assíncronos; a concorrência fica limitada
+# ao tamanho do pool e as demais queries aguardam na fila sem bloquear o event loop
+_db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+
+async def execute_db_query_async(query, params=(), fetch_one=False, fetch_all=False, commit=False):
+    """Versão assíncrona de execute_db_query, executada no executor do banco de dados"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _db_executor,
+        functools.partial(execute_db_query, query, params, fetch_one=fetch_one, fetch_all=fetch_all, commit=commit)
+    )
+
+async def run_db_async(func, *args):
+    """Executa uma função síncrona de acesso ao banco no executor do banco de dados"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args))
+
 def init_db():
+    """Cria ou atualiza o schema do banco aplicando as migrações pendentes"""
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Tabela para armazenar informações sobre as imagens processadas
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS processed_images (
-            id TEXT PRIMARY KEY,
-            filename TEXT NOT NULL,
-            upload_date TEXT NOT NULL,
-            page_count INTEGER NOT NULL,
-            thumbnail_path TEXT
-        )
-        ''')
-        
-        # Tabela para armazenar coordenadas salvas
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS saved_coordinates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            image_id TEXT NOT NULL,
-            name TEXT NOT NULL,
-            x REAL NOT NULL,
-            y REAL NOT NULL,
-            page INTEGER NOT NULL,
-            created_at TEXT NOT NULL,
-            source TEXT,
-            FOREIGN KEY (image_id) REFERENCES processed_images (id)
-        )
-        ''')
-        
-        # Verificar se a coluna source já existe
-        cursor.execute("PRAGMA table_info(saved_coordinates)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        # Se a coluna source não existir, adicioná-la
-        if 'source' not in columns:
-            print("Migrando banco de dados: adicionando coluna 'source' à tabela saved_coordinates")
-            try:
-                cursor.execute("ALTER TABLE saved_coordinates ADD COLUMN source TEXT")
-                # Atualizar registros existentes para usar filename como source
-                cursor.execute('''
-                UPDATE saved_coordinates 
-                SET source = (SELECT filename FROM processed_images WHERE id = saved_coordinates.image_id)
-                WHERE source IS NULL
-                ''')
-                print("Migração concluída com sucesso")
-            except Exception as e:
-                print(f"Erro na migração: {e}")
-        
-        conn.commit() 
\ No newline at end of file
+        migrate(conn)
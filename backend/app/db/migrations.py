@@ -0,0 +1,228 @@
+"""
+Migrações versionadas do banco de dados.
+
+A versão aplicada fica em PRAGMA user_version. Cada migração roda em sua própria
+transação e só é aplicada uma vez; para alterar o schema, acrescente uma nova
+entrada ao final de MIGRATIONS (nunca edite uma migração já publicada).
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in cursor.fetchall()]
+
+def _create_base_tables(cursor):
+    # Tabela para armazenar informações sobre as imagens processadas
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS processed_images (
+        id TEXT PRIMARY KEY,
+        filename TEXT NOT NULL,
+        upload_date TEXT NOT NULL,
+        page_count INTEGER NOT NULL,
+        thumbnail_path TEXT
+    )
+    ''')
+    
+    # Tabela para armazenar coordenadas salvas
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS saved_coordinates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        image_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        x REAL NOT NULL,
+        y REAL NOT NULL,
+        page INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        source TEXT,
+        FOREIGN KEY (image_id) REFERENCES processed_images (id)
+    )
+    ''')
+
+def _add_coordinate_source(cursor):
+    # Bancos antigos não têm a coluna source; os registros existentes usam o filename
+    if 'source' not in _columns(cursor, "saved_coordinates"):
+        cursor.execute("ALTER TABLE saved_coordinates ADD COLUMN source TEXT")
+        cursor.execute('''
+        UPDATE saved_coordinates 
+        SET source = (SELECT filename FROM processed_images WHERE id = saved_coordinates.image_id)
+        WHERE source IS NULL
+        ''')
+
+def _add_image_variants(cursor):
+    # Variantes (perfis de renderização) geradas no upload, em JSON
+    if 'variants' not in _columns(cursor, "processed_images"):
+        cursor.execute("ALTER TABLE processed_images ADD COLUMN variants TEXT NOT NULL DEFAULT '[\"full\"]'")
+
+def _add_image_content_hash(cursor):
+    # Hash SHA-256 do PDF original, usado para deduplicar uploads
+    if 'content_hash' not in _columns(cursor, "processed_images"):
+        cursor.execute("ALTER TABLE processed_images ADD COLUMN content_hash TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_processed_images_content_hash ON processed_images (content_hash)")
+
+def _add_listing_indexes(cursor):
+    # Coordenadas de uma imagem ordenadas por data (listagem e exportação)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saved_coordinates_image_created ON saved_coordinates (image_id, created_at)")
+    # /all-coordinates ordenado por data; o id (rowid) já faz parte de toda entrada de índice
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saved_coordinates_created ON saved_coordinates (created_at)")
+    # Filtros por página dentro de uma imagem
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saved_coordinates_image_page ON saved_coordinates (image_id, page)")
+    # Busca por nome (igualdade e prefixo sem diferenciar maiúsculas)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saved_coordinates_name ON saved_coordinates (name COLLATE NOCASE)")
+    # Histórico ordenado por data de upload
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_processed_images_upload_date ON processed_images (upload_date)")
+
+def _add_coordinates_fts(cursor):
+    # Índice full-text (FTS5) sobre nome e fonte, com conteúdo externo em saved_coordinates
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS saved_coordinates_fts USING fts5(
+        name,
+        source,
+        content='saved_coordinates',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''')
+    
+    # Triggers mantêm o índice sincronizado com a tabela
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS saved_coordinates_fts_insert AFTER INSERT ON saved_coordinates BEGIN
+        INSERT INTO saved_coordinates_fts (rowid, name, source) VALUES (new.id, new.name, new.source);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS saved_coordinates_fts_delete AFTER DELETE ON saved_coordinates BEGIN
+        INSERT INTO saved_coordinates_fts (saved_coordinates_fts, rowid, name, source) VALUES ('delete', old.id, old.name, old.source);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS saved_coordinates_fts_update AFTER UPDATE OF name, source ON saved_coordinates BEGIN
+        INSERT INTO saved_coordinates_fts (saved_coordinates_fts, rowid, name, source) VALUES ('delete', old.id, old.name, old.source);
+        INSERT INTO saved_coordinates_fts (rowid, name, source) VALUES (new.id, new.name, new.source);
+    END
+    ''')
+    
+    # Indexa as coordenadas já existentes
+    cursor.execute("INSERT INTO saved_coordinates_fts (saved_coordinates_fts) VALUES ('rebuild')")
+
+def _add_page_words(cursor):
+    # Palavras extraídas dos PDFs com a caixa delimitadora (em pontos do PDF) e o
+    # centro em coordenadas do visualizador (normalizadas pela largura da página)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS page_words (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        image_id TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        word TEXT NOT NULL COLLATE NOCASE,
+        x REAL NOT NULL,
+        y REAL NOT NULL,
+        x0 REAL NOT NULL,
+        y0 REAL NOT NULL,
+        x1 REAL NOT NULL,
+        y1 REAL NOT NULL,
+        FOREIGN KEY (image_id) REFERENCES processed_images (id)
+    )
+    ''')
+    # Busca exata e por prefixo sem diferenciar maiúsculas
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_page_words_word ON page_words (word)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_page_words_image_page ON page_words (image_id, page)")
+
+def _add_coordinates_rtree(cursor):
+    # Cada par (imagem, página) recebe uma chave inteira, usada como terceira dimensão
+    # do R*Tree para que as buscas espaciais fiquem restritas a uma única página
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS coordinate_pages (
+        key INTEGER PRIMARY KEY,
+        image_id TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        UNIQUE (image_id, page)
+    )
+    ''')
+    # Índice espacial (R*Tree) dos pontos: caixas degeneradas (min = max) em x e y
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS saved_coordinates_rtree USING rtree(
+        id,
+        min_plane, max_plane,
+        min_x, max_x,
+        min_y, max_y
+    )
+    ''')
+    
+    # Triggers mantêm o índice sincronizado com a tabela
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS saved_coordinates_rtree_insert AFTER INSERT ON saved_coordinates BEGIN
+        INSERT OR IGNORE INTO coordinate_pages (image_id, page) VALUES (new.image_id, new.page);
+        INSERT INTO saved_coordinates_rtree
+        SELECT new.id, key, key, new.x, new.x, new.y, new.y
+        FROM coordinate_pages WHERE image_id = new.image_id AND page = new.page;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS saved_coordinates_rtree_delete AFTER DELETE ON saved_coordinates BEGIN
+        DELETE FROM saved_coordinates_rtree WHERE id = old.id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS saved_coordinates_rtree_update AFTER UPDATE OF image_id, page, x, y ON saved_coordinates BEGIN
+        DELETE FROM saved_coordinates_rtree WHERE id = old.id;
+        INSERT OR IGNORE INTO coordinate_pages (image_id, page) VALUES (new.image_id, new.page);
+        INSERT INTO saved_coordinates_rtree
+        SELECT new.id, key, key, new.x, new.x, new.y, new.y
+        FROM coordinate_pages WHERE image_id = new.image_id AND page = new.page;
+    END
+    ''')
+    
+    # Indexa as coordenadas já existentes
+    cursor.execute("INSERT OR IGNORE INTO coordinate_pages (image_id, page) SELECT DISTINCT image_id, page FROM saved_coordinates")
+    cursor.execute('''
+    INSERT INTO saved_coordinates_rtree
+    SELECT sc.id, cp.key, cp.key, sc.x, sc.x, sc.y, sc.y
+    FROM saved_coordinates sc
+    JOIN coordinate_pages cp ON cp.image_id = sc.image_id AND cp.page = sc.page
+    ''')
+
+def _use_thumbnail_endpoint(cursor):
+    # thumbnail_path apontava para a página 1 em resolução completa; passa para a miniatura
+    cursor.execute('''
+    UPDATE processed_images
+    SET thumbnail_path = '/thumbnails/' || id || '/1'
+    WHERE thumbnail_path IS NULL OR thumbnail_path = '/images/' || id || '/page_1.png'
+    ''')
+
+# (versão, descrição, função que aplica a migração)
+MIGRATIONS = [
+    (1, "tabelas processed_images e saved_coordinates", _create_base_tables),
+    (2, "coluna source em saved_coordinates", _add_coordinate_source),
+    (3, "coluna variants em processed_images", _add_image_variants),
+    (4, "coluna content_hash em processed_images", _add_image_content_hash),
+    (5, "índices de listagem de coordenadas e histórico", _add_listing_indexes),
+    (6, "índice full-text (FTS5) de nome e fonte das coordenadas", _add_coordinates_fts),
+    (7, "tabela page_words com as palavras extraídas dos PDFs", _add_page_words),
+    (8, "índice espacial (R*Tree) das coordenadas por página", _add_coordinates_rtree),
+    (9, "thumbnail_path aponta para a miniatura da primeira página", _use_thumbnail_endpoint),
+]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn, target_version=None):
+    """Aplica, em ordem, as migrações pendentes até target_version (padrão: a mais recente)"""
+    for version, description, apply in MIGRATIONS:
+        if target_version is not None and version > target_version:
+            break
+        
+        # BEGIN IMMEDIATE serializa workers que iniciam ao mesmo tempo
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            logger.info("Migrando banco de dados para a versão %d: %s", version, description)
+            apply(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception("Erro na migração %d", version)
+            raise
@@ -1,17 +1,64 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Body
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Body, Request, Response, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
+import logging
 import os
 import uuid
-import csv
-from io import StringIO
+import hashlib
+import json
+import shutil
+from io import TextIOWrapper
 from datetime import datetime
-from .db.database import execute_db_query, init_db
-from .services.pdf_service import convert_pdf_to_images
+from typing import Any, List, Optional
+from .db.database import execute_db_query_async, init_db
+from .core.config import (
+    UPLOAD_CHUNK_SIZE, RENDER_PROFILES, INGEST_PROFILES, TILE_SIZE,
+    STORAGE_REDIRECT_DOWNLOADS, S3_PRESIGN_EXPIRES_SECONDS
+)
+from .core.metrics import MetricsMiddleware, render_metrics
+from .core.log import RequestLoggingMiddleware, setup_logging, debug_sampled
+from .core.json_response import ROW_FORMATS, rows_response
+from .core.http_cache import make_etag, not_modified, cached_file_response
+from .services.pdf_service import (
+    process_pdf,
+    register_pdf,
+    find_duplicate_upload,
+    get_page_image,
+    parse_page_image_name,
+    profile_signature,
+    stored_image_name,
+    index_session_text
+)
+from .services.page_store import page_store
+from .services.tile_service import get_tile_info, get_tile
+from .services.text_service import search_text
+from .services.job_service import create_job, get_job, submit_job, find_active_job
+from .services.coordinate_service import (
+    INSERT_COORDINATE_QUERY,
+    get_coordinates_page, search_coordinates,
+    fetch_all_coordinates_rows, fetch_image_coordinates_rows,
+    get_coordinates_in_region, get_nearest_coordinates,
+    read_coordinates_csv, import_coordinates
+)
+from .services.export_service import (
+    COLUMNAR_FORMATS, stream_coordinates_csv, stream_coordinates_columnar, gzip_stream
+)
+from .services.storage_service import get_storage_report, collect_garbage, start_storage_gc
+from .services.response_cache import response_cache, HISTORY_KEY, image_info_key, image_coordinates_key
 from .models.coordinate import CoordinateCreate
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
 
+# Id por requisição (X-Request-ID) e log de acesso com a duração
+app.add_middleware(RequestLoggingMiddleware)
+
+# Métricas por rota (latência, status e requisições em andamento), expostas em /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,13 +68,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Diretório para armazenar arquivos processados
-UPLOAD_DIR = "/app/uploads"  # Caminho absoluto no container
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 # Inicializa o banco de dados
 init_db()
 
+# Coleta de lixo periódica das sessões de upload (retenção por idade e por total de bytes)
+start_storage_gc()
+
 @app.get("/health")
 async def health_check():
     """Endpoint para verificação de saúde da API"""
@@ -37,124 +83,340 @@ async def health_check():
         "service": "search-the-point-backend"
     }
 
-@app.post("/upload-pdf/")
-async def upload_pdf(file: UploadFile = File(...)):
-    """Upload e processamento de arquivo PDF"""
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato de texto do Prometheus (latência por rota, queries, renderização de páginas)"""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Nome do PDF dentro do diretório da sessão (find_session_pdf procura qualquer .pdf)
+UPLOAD_PDF_NAME = "document.pdf"
+
+@app.post("/upload-pdf/", status_code=202)
+async def upload_pdf(
+    response: Response,
+    file: UploadFile = File(...),
+    profiles: Optional[str] = Query(None, description="Perfis renderizados no upload, separados por vírgula (ex.: preview,full)")
+):
+    """Upload de arquivo PDF; a rasterização é enviada para a fila de jobs"""
+    profile_list = [profile for profile in profiles.split(",") if profile] if profiles is not None else INGEST_PROFILES
+    unknown = [profile for profile in profile_list if profile not in RENDER_PROFILES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Perfis de renderização desconhecidos: {', '.join(unknown)}")
+    
     try:
         # Gera um ID único para este upload
         session_id = str(uuid.uuid4())
-        session_dir = os.path.join(UPLOAD_DIR, session_id)
+        session_dir = page_store.staging_dir(session_id)
         os.makedirs(session_dir, exist_ok=True)
         
-        # Salva o arquivo PDF
-        pdf_path = os.path.join(session_dir, file.filename)
+        # Salva o arquivo PDF em blocos, calculando o SHA-256 durante a escrita; o nome enviado
+        # pelo cliente só é guardado no banco, nunca usado como caminho
+        pdf_path = os.path.join(session_dir, UPLOAD_PDF_NAME)
+        hasher = hashlib.sha256()
         with open(pdf_path, "wb") as buffer:
-            buffer.write(await file.read())
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        content_hash = hasher.hexdigest()
         
-        # Converte PDF para imagens
-        images_info = convert_pdf_to_images(pdf_path, session_dir)
+        # Documento idêntico já enviado: reaproveita as páginas já renderizadas
+        duplicate = await run_in_threadpool(find_duplicate_upload, content_hash)
+        active_job_id = find_active_job(content_hash) if not duplicate else None
+        if duplicate or active_job_id:
+            await run_in_threadpool(shutil.rmtree, session_dir, True)
+        if duplicate:
+            response.status_code = 200
+            return {**duplicate, "status": "completed", "deduplicated": True}
+        if active_job_id:
+            job = get_job(active_job_id)
+            return {
+                "job_id": active_job_id,
+                "session_id": job["session_id"],
+                "filename": job["filename"],
+                "status": job["status"],
+                "deduplicated": True
+            }
         
-        # Salva informação da imagem no banco de dados
-        thumbnail_path = f"/images/{session_id}/page_1.png"  # Usa a primeira página como thumbnail
+        # Sem perfis para pré-renderizar só lê as dimensões das páginas; cada página é renderizada no primeiro acesso
+        if not profile_list:
+            response.status_code = 200
+            result = await run_in_threadpool(register_pdf, session_id, pdf_path, file.filename, content_hash)
+            
+            # A extração de texto para a busca segue em segundo plano
+            text_job_id = create_job(session_id, file.filename)
+            submit_job(text_job_id, index_session_text, session_id)
+            
+            return {**result, "status": "completed", "text_job_id": text_job_id, "deduplicated": False}
         
-        # Executa query segura para inserir imagem
-        execute_db_query(
-            "INSERT INTO processed_images (id, filename, upload_date, page_count, thumbnail_path) VALUES (?, ?, ?, ?, ?)",
-            (session_id, file.filename, datetime.now().isoformat(), len(images_info), thumbnail_path),
-            commit=True
-        )
+        # Converte PDF para imagens em segundo plano
+        job_id = create_job(session_id, file.filename, content_hash)
+        submit_job(job_id, process_pdf, session_id, pdf_path, file.filename, profile_list, content_hash)
         
         return {
+            "job_id": job_id,
             "session_id": session_id,
             "filename": file.filename,
-            "pages": images_info
+            "profiles": profile_list,
+            "status": "queued",
+            "deduplicated": False
         }
     except Exception as e:
-        print(f"Erro ao processar PDF: {e}")
+        logger.exception("Erro ao processar PDF")
         raise HTTPException(status_code=500, detail=f"Erro ao processar PDF: {str(e)}")
 
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Retorna o status e o progresso por página de um job de rasterização"""
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+def _stored_page_redirect(session_id, page, profile):
+    """Com STORAGE_REDIRECT_DOWNLOADS, redireciona para a URL pré-assinada da página guardada no bucket"""
+    if not STORAGE_REDIRECT_DOWNLOADS:
+        return None
+    url = page_store.download_url(f"{session_id}/{stored_image_name(page, profile)}")
+    if not url:
+        return None
+    # A URL expira: o redirecionamento só pode ficar em cache por parte da validade
+    return RedirectResponse(url, status_code=307, headers={"Cache-Control": f"private, max-age={S3_PRESIGN_EXPIRES_SECONDS // 2}"})
+
 @app.get("/images/{session_id}/{image_name}")
-async def get_image(session_id: str, image_name: str):
-    """Retorna uma imagem específica"""
+async def get_image(session_id: str, image_name: str, request: Request):
+    """Retorna uma imagem específica (page_N.png ou page_N_<perfil>.<ext>), renderizando sob demanda se necessário"""
     try:
-        image_path = os.path.join(UPLOAD_DIR, session_id, image_name)
-        if not os.path.exists(image_path):
-            print(f"Imagem não encontrada: {image_path}")
+        parsed = parse_page_image_name(image_name)
+        etag = make_etag(session_id, image_name, profile_signature(parsed[1]) if parsed else None)
+        # O cliente já tem a imagem: responde 304 sem tocar no disco nem renderizar
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
+        if not parsed:
+            raise HTTPException(status_code=404, detail="Imagem não encontrada")
+        redirect = await run_in_threadpool(_stored_page_redirect, session_id, *parsed)
+        if redirect:
+            return redirect
+        image_path = await run_in_threadpool(get_page_image, session_id, *parsed)
+        if not image_path:
+            debug_sampled(logger, "Imagem não encontrada: %s/%s", session_id, image_name)
             raise HTTPException(status_code=404, detail="Imagem não encontrada")
-        return FileResponse(image_path, media_type="image/png")
+        media_type = "image/jpeg" if image_path.endswith(".jpg") else "image/png"
+        return cached_file_response(request, image_path, media_type, etag)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Erro ao buscar imagem: {e}")
+        logger.exception("Erro ao buscar imagem")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar imagem: {str(e)}")
 
+@app.get("/thumbnails/{session_id}/{page}")
+async def get_thumbnail(session_id: str, page: int, request: Request):
+    """Retorna a miniatura (JPEG de baixa resolução) de uma página, usada no histórico e na lista de páginas"""
+    try:
+        etag = make_etag(session_id, "thumbnail", page, profile_signature("thumbnail"))
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
+        redirect = await run_in_threadpool(_stored_page_redirect, session_id, page, "thumbnail")
+        if redirect:
+            return redirect
+        image_path = await run_in_threadpool(get_page_image, session_id, page, "thumbnail")
+        if not image_path:
+            raise HTTPException(status_code=404, detail="Página não encontrada")
+        return cached_file_response(request, image_path, "image/jpeg", etag)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Erro ao buscar miniatura")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar miniatura: {str(e)}")
+
+@app.get("/tiles/{session_id}/{page}/info")
+async def get_page_tile_info(session_id: str, page: int):
+    """Descreve a pirâmide de tiles (Deep Zoom) de uma página"""
+    info = await run_in_threadpool(get_tile_info, session_id, page)
+    if not info:
+        raise HTTPException(status_code=404, detail="Página não encontrada")
+    return info
+
+@app.get("/tiles/{session_id}/{page}/{z}/{x}/{y}")
+async def get_page_tile(session_id: str, page: int, z: int, x: int, y: int, request: Request):
+    """Retorna um tile da página no nível de zoom z, renderizado sob demanda"""
+    try:
+        etag = make_etag(session_id, "tiles", page, z, x, y, TILE_SIZE)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
+        tile_path = await run_in_threadpool(get_tile, session_id, page, z, x, y)
+        if not tile_path:
+            raise HTTPException(status_code=404, detail="Tile não encontrado")
+        return cached_file_response(request, tile_path, "image/png", etag)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Erro ao gerar tile")
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar tile: {str(e)}")
+
 @app.get("/history")
 async def get_processed_images():
     """Retorna histórico de imagens processadas"""
-    rows = execute_db_query(
-        "SELECT * FROM processed_images ORDER BY upload_date DESC",
-        fetch_all=True
-    )
-    
-    result = []
-    for row in rows:
-        result.append({
-            "id": row["id"],
-            "filename": row["filename"],
-            "upload_date": row["upload_date"],
-            "page_count": row["page_count"],
-            "thumbnail_path": row["thumbnail_path"]
-        })
-    
-    return result
-
-@app.get("/all-coordinates", tags=["coordinates"])
-async def get_all_coordinates():
-    """Busca todas as coordenadas salvas"""
-    print("Buscando todas as coordenadas...")
-    try:
-        rows = execute_db_query(
-            """
-            SELECT sc.*, pi.filename 
-            FROM saved_coordinates sc
-            JOIN processed_images pi ON sc.image_id = pi.id
-            ORDER BY sc.created_at DESC
-            """,
+    async def load():
+        rows = await execute_db_query_async(
+            "SELECT * FROM processed_images ORDER BY upload_date DESC",
             fetch_all=True
         )
         
-        print(f"Encontradas {len(rows) if rows else 0} coordenadas no banco de dados")
-        
         result = []
         for row in rows:
-            source = row["source"] if row["source"] else row["filename"]
             result.append({
                 "id": row["id"],
-                "image_id": row["image_id"],
-                "name": row["name"],
-                "x": row["x"],
-                "y": row["y"],
-                "page": row["page"],
-                "created_at": row["created_at"],
-                "source": source,
-                "filename": row["filename"]
+                "filename": row["filename"],
+                "upload_date": row["upload_date"],
+                "page_count": row["page_count"],
+                "thumbnail_path": row["thumbnail_path"],
+                "variants": json.loads(row["variants"])
             })
         
         return result
+    
+    return await response_cache.get_or_load(HISTORY_KEY, load)
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Retorna os contadores do cache de respostas (acertos, falhas, invalidações)"""
+    return response_cache.stats()
+
+@app.get("/admin/storage", tags=["admin"])
+async def get_storage_usage():
+    """Uso de disco por sessão de upload, diretórios órfãos, cache de renderização e limites de retenção"""
+    return await run_in_threadpool(get_storage_report)
+
+@app.post("/admin/storage/gc", tags=["admin"])
+async def run_storage_gc(dry_run: bool = Query(False, description="Só lista o que seria removido")):
+    """Executa agora a coleta de lixo do armazenamento e retorna as sessões removidas ou compactadas"""
+    try:
+        return await run_in_threadpool(collect_garbage, dry_run)
     except Exception as e:
-        print(f"Erro ao buscar todas as coordenadas: {e}")
+        logger.exception("Erro na coleta de lixo do armazenamento")
+        raise HTTPException(status_code=500, detail=f"Erro na coleta de lixo: {str(e)}")
+
+@app.get("/all-coordinates", tags=["coordinates"])
+async def get_all_coordinates(
+    format: str = Query("objects", description="objects (lista de objetos) ou compact (colunas + linhas em arrays)")
+):
+    """Busca todas as coordenadas salvas"""
+    if format not in ROW_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato desconhecido: {format}")
+    try:
+        columns, rows = await fetch_all_coordinates_rows()
+        debug_sampled(logger, "Encontradas %d coordenadas no banco de dados", len(rows), rows=len(rows))
+        return rows_response(columns, rows, format)
+    except Exception as e:
+        logger.exception("Erro ao buscar todas as coordenadas")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar coordenadas: {str(e)}")
 
-@app.get("/coordinates/export/{image_id}", tags=["coordinates"])
-async def export_coordinates_csv(image_id: str):
-    """Exporta coordenadas para CSV"""
-    # Busca as coordenadas
-    rows = execute_db_query(
-        "SELECT * FROM saved_coordinates WHERE image_id = ? ORDER BY created_at",
-        (image_id,),
-        fetch_all=True
-    )
+@app.get("/coordinates", tags=["coordinates"])
+async def list_coordinates(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor da página anterior"),
+    q: Optional[str] = Query(None, description="Trecho do nome ou da fonte"),
+    name: Optional[str] = None,
+    source: Optional[str] = None,
+    image_id: Optional[str] = None,
+    page: Optional[int] = None
+):
+    """Lista coordenadas com filtros no servidor e paginação por cursor (mais recentes primeiro)"""
+    try:
+        return await get_coordinates_page(limit, cursor, q, name, source, image_id, page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Erro ao listar coordenadas")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar coordenadas: {str(e)}")
+
+@app.get("/search/coordinates", tags=["coordinates"])
+async def search_saved_coordinates(
+    q: str = Query(..., description="Termos buscados no nome e na fonte (casam por prefixo)"),
+    image_id: Optional[str] = None,
+    page: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Busca full-text de coordenadas por nome ou fonte, ordenada por relevância"""
+    try:
+        return await search_coordinates(q, image_id, page, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Erro na busca de coordenadas")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar coordenadas: {str(e)}")
+
+@app.get("/search/text")
+async def search_pdf_text(
+    q: str = Query(..., description="Palavra ou tag buscada no texto dos PDFs (ex.: V-101)"),
+    image_id: Optional[str] = None,
+    page: Optional[int] = None,
+    prefix: bool = Query(True, description="Casa palavras que começam com o texto buscado"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Busca palavras extraídas dos PDFs e retorna imagem, página e posição (x, y) de cada ocorrência"""
+    try:
+        return await search_text(q, image_id, page, prefix, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Erro na busca de texto")
+        raise HTTPException(status_code=500, detail=f"Erro na busca de texto: {str(e)}")
+
+def _export_download(image_ids, filename, export_format, gzip, multi_image=False):
+    """Monta a resposta em streaming da exportação no formato pedido (csv, parquet ou arrow)"""
+    if export_format in COLUMNAR_FORMATS:
+        try:
+            chunks = stream_coordinates_columnar(export_format, image_ids)
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Exportação colunar indisponível: instale o pacote pyarrow")
+        media_type, extension = COLUMNAR_FORMATS[export_format]
+        return StreamingResponse(
+            chunks,
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename={filename}.{extension}"}
+        )
+    
+    if export_format != "csv":
+        raise HTTPException(status_code=400, detail=f"Formato de exportação desconhecido: {export_format}")
     
+    chunks = stream_coordinates_csv(image_ids, multi_image)
+    if gzip:
+        return StreamingResponse(
+            gzip_stream(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f"attachment; filename={filename}.csv.gz"}
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}.csv"}
+    )
+
+@app.get("/coordinates/export", tags=["coordinates"])
+async def export_all_coordinates(
+    image_id: Optional[List[str]] = Query(None, description="Imagens exportadas (repita o parâmetro); sem ele, todas"),
+    format: str = Query("csv", description="csv, parquet ou arrow"),
+    gzip: bool = Query(False, description="Comprime o CSV em gzip")
+):
+    """Exporta em um único arquivo as coordenadas de várias imagens (ou de todas), com o id e o arquivo de cada imagem"""
+    return _export_download(image_id, "coordenadas", format, gzip, multi_image=True)
+
+@app.get("/coordinates/export/{image_id}", tags=["coordinates"])
+async def export_coordinates_csv(
+    image_id: str,
+    format: str = Query("csv", description="csv, parquet ou arrow"),
+    gzip: bool = Query(False, description="Comprime o CSV em gzip")
+):
+    """Exporta coordenadas para CSV (ou Parquet/Arrow)"""
     # Busca informações da imagem
-    image = execute_db_query(
+    image = await execute_db_query_async(
         "SELECT filename FROM processed_images WHERE id = ?",
         (image_id,),
         fetch_one=True
@@ -163,35 +425,9 @@ async def export_coordinates_csv(image_id: str):
     if not image:
         raise HTTPException(status_code=404, detail="Imagem não encontrada")
     
-    # Cria arquivo CSV em memória
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Escreve cabeçalho
-    writer.writerow(["id", "nome", "x", "y", "pagina", "data_criacao", "fonte"])
-    
-    # Escreve dados
-    for row in rows:
-        source = row["source"] if row["source"] else "Desconhecido"
-        writer.writerow([
-            row["id"],
-            row["name"],
-            row["x"],
-            row["y"],
-            row["page"],
-            row["created_at"],
-            source
-        ])
-    
-    # Prepara o arquivo para download
-    output.seek(0)
-    filename = f"coordenadas_{image['filename'].replace('.pdf', '')}.csv"
-    
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    # O arquivo é gerado em blocos enquanto é enviado, sem ser montado em memória
+    filename = f"coordenadas_{image['filename'].replace('.pdf', '')}"
+    return _export_download([image_id], filename, format, gzip)
 
 @app.post("/coordinates/{image_id}", tags=["coordinates"])
 async def save_coordinate(
@@ -199,97 +435,155 @@ async def save_coordinate(
     coordinate: CoordinateCreate
 ):
     """Salva uma coordenada para uma imagem"""
-    print(f"Salvando coordenada para imagem {image_id}: {coordinate}")
-    # Verifica se a imagem existe
-    image = execute_db_query(
-        "SELECT id, filename FROM processed_images WHERE id = ?", 
+    # Salva a coordenada (verifica a imagem e resolve o source no mesmo statement)
+    created_at = datetime.now().isoformat()
+    try:
+        saved = await execute_db_query_async(
+            INSERT_COORDINATE_QUERY,
+            (coordinate.name, coordinate.x, coordinate.y, coordinate.page, created_at, coordinate.source, image_id),
+            fetch_one=True,
+            commit=True
+        )
+    except Exception as e:
+        logger.exception("Erro ao salvar coordenada")
+        raise HTTPException(status_code=500, detail=f"Erro ao salvar coordenada: {str(e)}")
+    
+    if not saved:
+        debug_sampled(logger, "Imagem %s não encontrada no banco de dados", image_id, image_id=image_id)
+        raise HTTPException(status_code=404, detail="Imagem não encontrada")
+    
+    response_cache.invalidate(image_coordinates_key(image_id))
+    debug_sampled(logger, "Coordenada salva com sucesso, ID: %s", saved["id"], image_id=image_id, coordinate_id=saved["id"])
+    
+    # Retorna o ID da coordenada criada
+    return {
+        "id": saved["id"],
+        "image_id": image_id,
+        "name": coordinate.name,
+        "x": coordinate.x,
+        "y": coordinate.y,
+        "page": coordinate.page,
+        "created_at": created_at,
+        "source": saved["source"]
+    }
+
+async def _get_image_filename(image_id):
+    image = await execute_db_query_async(
+        "SELECT filename FROM processed_images WHERE id = ?",
         (image_id,),
         fetch_one=True
     )
-    
     if not image:
-        print(f"Imagem {image_id} não encontrada no banco de dados")
         raise HTTPException(status_code=404, detail="Imagem não encontrada")
+    return image["filename"]
+
+@app.post("/coordinates/{image_id}/batch", tags=["coordinates"])
+async def save_coordinates_batch(image_id: str, records: List[Any] = Body(...)):
+    """
+    Salva um lote de coordenadas (array JSON no formato de CoordinateCreate, com created_at
+    opcional) em uma única transação. A resposta é NDJSON: uma linha por registro inválido
+    e um resumo com o total inserido
+    """
+    filename = await _get_image_filename(image_id)
+    logger.info("Importando %d coordenadas para imagem %s", len(records), image_id, extra={"image_id": image_id, "records": len(records)})
+    return StreamingResponse(
+        import_coordinates(image_id, filename, records),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/coordinates/{image_id}/import", tags=["coordinates"])
+async def import_coordinates_csv(image_id: str, file: UploadFile = File(...)):
+    """Importa coordenadas de um CSV no formato de /coordinates/export (resposta NDJSON como em /batch)"""
+    filename = await _get_image_filename(image_id)
     
-    # Se não foi fornecido um source, usa o nome do arquivo como source
-    source = coordinate.source if coordinate.source else image["filename"]
+    # utf-8-sig aceita o BOM das planilhas exportadas pelo Excel
+    text_stream = TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        records = read_coordinates_csv(text_stream)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Salva a coordenada
-    created_at = datetime.now().isoformat()
+    logger.info("Importando coordenadas do arquivo %s para imagem %s", file.filename, image_id, extra={"image_id": image_id, "file": file.filename})
+    return StreamingResponse(
+        import_coordinates(image_id, filename, records),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/coordinates/{image_id}/region", tags=["coordinates"])
+async def get_coordinates_region(
+    image_id: str,
+    page: int = Query(..., ge=1),
+    x0: float = Query(..., description="Canto do retângulo em coordenadas do visualizador"),
+    y0: float = Query(...),
+    x1: float = Query(..., description="Canto oposto do retângulo"),
+    y1: float = Query(...),
+    limit: int = Query(5000, ge=1, le=50000)
+):
+    """Busca as coordenadas de uma página dentro de um retângulo (ex.: o viewport atual)"""
     try:
-        coord_id = execute_db_query(
-            "INSERT INTO saved_coordinates (image_id, name, x, y, page, created_at, source) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (image_id, coordinate.name, coordinate.x, coordinate.y, coordinate.page, created_at, source),
-            commit=True
-        )
-        print(f"Coordenada salva com sucesso, ID: {coord_id}")
-        
-        # Retorna o ID da coordenada criada
-        return {
-            "id": coord_id,
-            "image_id": image_id,
-            "name": coordinate.name,
-            "x": coordinate.x,
-            "y": coordinate.y,
-            "page": coordinate.page,
-            "created_at": created_at,
-            "source": source
-        }
+        return await get_coordinates_in_region(image_id, page, x0, y0, x1, y1, limit)
     except Exception as e:
-        print(f"Erro ao salvar coordenada: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro ao salvar coordenada: {str(e)}")
+        logger.exception("Erro ao buscar coordenadas na região")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar coordenadas na região: {str(e)}")
+
+@app.get("/coordinates/{image_id}/nearest", tags=["coordinates"])
+async def get_coordinates_nearest(
+    image_id: str,
+    page: int = Query(..., ge=1),
+    x: float = Query(...),
+    y: float = Query(...),
+    k: int = Query(1, ge=1, le=100),
+    max_distance: Optional[float] = Query(None, gt=0, description="Distância máxima em coordenadas do visualizador")
+):
+    """Busca as k coordenadas mais próximas de um ponto (ex.: o clique do usuário)"""
+    try:
+        return await get_nearest_coordinates(image_id, page, x, y, k, max_distance)
+    except Exception as e:
+        logger.exception("Erro ao buscar coordenadas próximas")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar coordenadas próximas: {str(e)}")
 
 @app.get("/coordinates/{image_id}", tags=["coordinates"])
-async def get_coordinates(image_id: str):
+async def get_coordinates(
+    image_id: str,
+    format: str = Query("objects", description="objects (lista de objetos) ou compact (colunas + linhas em arrays)")
+):
     """Busca coordenadas salvas para uma imagem"""
-    print(f"Buscando coordenadas para imagem {image_id}")
+    if format not in ROW_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato desconhecido: {format}")
+    
+    async def load():
+        columns, rows = await fetch_image_coordinates_rows(image_id)
+        debug_sampled(logger, "Encontradas %d coordenadas para imagem %s", len(rows), image_id, image_id=image_id, rows=len(rows))
+        return columns, rows
+    
     try:
-        rows = execute_db_query(
-            "SELECT * FROM saved_coordinates WHERE image_id = ? ORDER BY created_at DESC",
-            (image_id,),
-            fetch_all=True
-        )
-        
-        print(f"Encontradas {len(rows) if rows else 0} coordenadas para imagem {image_id}")
-        
-        result = []
-        for row in rows:
-            source = row["source"] if row["source"] else ""
-            result.append({
-                "id": row["id"],
-                "image_id": row["image_id"],
-                "name": row["name"],
-                "x": row["x"],
-                "y": row["y"],
-                "page": row["page"],
-                "created_at": row["created_at"],
-                "source": source
-            })
-        
-        return result
+        columns, rows = await response_cache.get_or_load(image_coordinates_key(image_id), load)
+        return rows_response(columns, rows, format)
     except Exception as e:
-        print(f"Erro ao buscar coordenadas: {e}")
+        logger.exception("Erro ao buscar coordenadas")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar coordenadas: {str(e)}")
 
 @app.delete("/coordinates/{coordinate_id}", tags=["coordinates"])
 async def delete_coordinate(coordinate_id: int):
     """Remove uma coordenada salva"""
-    print(f"Removendo coordenada {coordinate_id}")
     try:
-        rows_affected = execute_db_query(
-            "DELETE FROM saved_coordinates WHERE id = ?", 
+        deleted = await execute_db_query_async(
+            "DELETE FROM saved_coordinates WHERE id = ? RETURNING id, image_id",
             (coordinate_id,),
+            fetch_one=True,
             commit=True
         )
         
-        if not rows_affected:
-            print(f"Coordenada {coordinate_id} não encontrada para remoção")
+        if not deleted:
             raise HTTPException(status_code=404, detail="Coordenada não encontrada")
         
-        print(f"Coordenada {coordinate_id} removida com sucesso")
+        response_cache.invalidate(image_coordinates_key(deleted["image_id"]))
+        debug_sampled(logger, "Coordenada %s removida", coordinate_id, image_id=deleted["image_id"], coordinate_id=coordinate_id)
         return {"success": True}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Erro ao remover coordenada: {e}")
+        logger.exception("Erro ao remover coordenada")
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail="Coordenada não encontrada")
         raise HTTPException(status_code=500, detail=f"Erro ao remover coordenada: {str(e)}")
@@ -297,28 +591,32 @@ async def delete_coordinate(coordinate_id: int):
 @app.get("/image-info/{image_id}")
 async def get_image_info(image_id: str):
     """Busca informações de uma imagem pelo ID"""
-    print(f"Buscando informações da imagem {image_id}")
-    try:
-        image = execute_db_query(
+    async def load():
+        image = await execute_db_query_async(
             "SELECT * FROM processed_images WHERE id = ?",
             (image_id,),
             fetch_one=True
         )
         
         if not image:
-            print(f"Imagem {image_id} não encontrada")
             raise HTTPException(status_code=404, detail="Imagem não encontrada")
         
-        print(f"Informações da imagem {image_id} encontradas: {image['filename']}")
+        debug_sampled(logger, "Informações da imagem %s carregadas do banco", image_id, image_id=image_id)
         return {
             "id": image["id"],
             "filename": image["filename"],
             "upload_date": image["upload_date"],
             "page_count": image["page_count"],
-            "thumbnail_path": image["thumbnail_path"]
+            "thumbnail_path": image["thumbnail_path"],
+            "variants": json.loads(image["variants"])
         }
+    
+    try:
+        return await response_cache.get_or_load(image_info_key(image_id), load)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Erro ao buscar informações da imagem: {e}")
+        logger.exception("Erro ao buscar informações da imagem")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar informações da imagem: {str(e)}")
 
 if __name__ == "__main__":
@@ -1,132 +1,428 @@
+import base64
+import csv
+import json
+import logging
+import math
+import re
 from datetime import datetime
-from ..db.database import execute_db_query
+from ..core.log import debug_sampled
+from ..db.database import (
+    execute_db_query, execute_db_query_async, execute_db_query_tuples, get_db_connection, run_db_async
+)
 from ..models.coordinate import CoordinateCreate
+from .response_cache import response_cache, image_coordinates_key
+
+logger = logging.getLogger(__name__)
+
+# Insere a coordenada em um único statement: só insere se a imagem existir e, sem source,
+# usa o nome do arquivo da imagem
+INSERT_COORDINATE_QUERY = """
+    INSERT INTO saved_coordinates (image_id, name, x, y, page, created_at, source)
+    SELECT id, ?, ?, ?, ?, ?, COALESCE(NULLIF(?, ''), filename)
+    FROM processed_images WHERE id = ?
+    RETURNING id, source
+"""
+
+# Colunas do CSV exportado, também aceitas na importação em lote
+CSV_COLUMNS = ["id", "nome", "x", "y", "pagina", "data_criacao", "fonte"]
+CSV_REQUIRED_COLUMNS = ["nome", "x", "y", "pagina"]
+# Fonte escrita no CSV quando a coordenada não tem uma
+CSV_UNKNOWN_SOURCE = "Desconhecido"
+
+IMPORT_COORDINATE_QUERY = """
+    INSERT INTO saved_coordinates (image_id, name, x, y, page, created_at, source)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Listagens já no formato da resposta: a fonte é resolvida no SQL e as linhas podem ser
+# serializadas direto das tuplas do cursor
+ALL_COORDINATES_QUERY = """
+    SELECT sc.id, sc.image_id, sc.name, sc.x, sc.y, sc.page, sc.created_at,
+           COALESCE(NULLIF(sc.source, ''), pi.filename) AS source, pi.filename
+    FROM saved_coordinates sc
+    JOIN processed_images pi ON sc.image_id = pi.id
+    ORDER BY sc.created_at DESC
+"""
+
+IMAGE_COORDINATES_QUERY = """
+    SELECT id, image_id, name, x, y, page, created_at, COALESCE(source, '') AS source
+    FROM saved_coordinates
+    WHERE image_id = ?
+    ORDER BY created_at DESC
+"""
+
+async def fetch_all_coordinates_rows():
+    """Busca todas as coordenadas salvas como (colunas, tuplas)"""
+    return await run_db_async(execute_db_query_tuples, ALL_COORDINATES_QUERY)
+
+async def fetch_image_coordinates_rows(image_id):
+    """Busca as coordenadas de uma imagem como (colunas, tuplas)"""
+    return await run_db_async(execute_db_query_tuples, IMAGE_COORDINATES_QUERY, (image_id,))
 
 def get_all_coordinates():
     """Busca todas as coordenadas salvas"""
-    print("Buscando todas as coordenadas...")
     try:
-        rows = execute_db_query(
-            """
-            SELECT sc.*, pi.filename 
-            FROM saved_coordinates sc
-            JOIN processed_images pi ON sc.image_id = pi.id
-            ORDER BY sc.created_at DESC
-            """,
-            fetch_all=True
-        )
-        
-        print(f"Encontradas {len(rows) if rows else 0} coordenadas no banco de dados")
-        
-        result = []
-        for row in rows:
-            source = row["source"] if row["source"] else row["filename"]
-            result.append({
-                "id": row["id"],
-                "image_id": row["image_id"],
-                "name": row["name"],
-                "x": row["x"],
-                "y": row["y"],
-                "page": row["page"],
-                "created_at": row["created_at"],
-                "source": source,
-                "filename": row["filename"]
-            })
-        
-        return result
+        columns, rows = execute_db_query_tuples(ALL_COORDINATES_QUERY)
+        debug_sampled(logger, "Encontradas %d coordenadas no banco de dados", len(rows), rows=len(rows))
+        return [dict(zip(columns, row)) for row in rows]
     except Exception as e:
-        print(f"Erro ao buscar todas as coordenadas: {e}")
+        logger.exception("Erro ao buscar todas as coordenadas")
         raise Exception(f"Erro ao buscar coordenadas: {str(e)}")
 
 def get_coordinates_by_image(image_id: str):
     """Busca coordenadas salvas para uma imagem"""
-    print(f"Buscando coordenadas para imagem {image_id}")
     try:
-        rows = execute_db_query(
-            "SELECT * FROM saved_coordinates WHERE image_id = ? ORDER BY created_at DESC",
-            (image_id,),
-            fetch_all=True
-        )
-        
-        print(f"Encontradas {len(rows) if rows else 0} coordenadas para imagem {image_id}")
-        
-        result = []
-        for row in rows:
-            source = row["source"] if row["source"] else ""
-            result.append({
-                "id": row["id"],
-                "image_id": row["image_id"],
-                "name": row["name"],
-                "x": row["x"],
-                "y": row["y"],
-                "page": row["page"],
-                "created_at": row["created_at"],
-                "source": source
-            })
-        
-        return result
+        columns, rows = execute_db_query_tuples(IMAGE_COORDINATES_QUERY, (image_id,))
+        debug_sampled(logger, "Encontradas %d coordenadas para imagem %s", len(rows), image_id, image_id=image_id, rows=len(rows))
+        return [dict(zip(columns, row)) for row in rows]
     except Exception as e:
-        print(f"Erro ao buscar coordenadas: {e}")
+        logger.exception("Erro ao buscar coordenadas")
         raise Exception(f"Erro ao buscar coordenadas: {str(e)}")
 
 def save_coordinate(image_id: str, coordinate: CoordinateCreate):
     """Salva uma coordenada para uma imagem"""
-    print(f"Salvando coordenada para imagem {image_id}: {coordinate}")
-    
-    # Verifica se a imagem existe
-    image = execute_db_query(
-        "SELECT id, filename FROM processed_images WHERE id = ?", 
-        (image_id,),
-        fetch_one=True
-    )
-    
-    if not image:
-        print(f"Imagem {image_id} não encontrada no banco de dados")
-        raise Exception("Imagem não encontrada")
-    
-    # Se não foi fornecido um source, usa o nome do arquivo como source
-    source = coordinate.source if coordinate.source else image["filename"]
-    
     # Salva a coordenada
     created_at = datetime.now().isoformat()
     try:
-        coord_id = execute_db_query(
-            "INSERT INTO saved_coordinates (image_id, name, x, y, page, created_at, source) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (image_id, coordinate.name, coordinate.x, coordinate.y, coordinate.page, created_at, source),
+        saved = execute_db_query(
+            INSERT_COORDINATE_QUERY,
+            (coordinate.name, coordinate.x, coordinate.y, coordinate.page, created_at, coordinate.source, image_id),
+            fetch_one=True,
             commit=True
         )
-        print(f"Coordenada salva com sucesso, ID: {coord_id}")
-        
-        return {
-            "id": coord_id,
-            "image_id": image_id,
-            "name": coordinate.name,
-            "x": coordinate.x,
-            "y": coordinate.y,
-            "page": coordinate.page,
-            "created_at": created_at,
-            "source": source
-        }
     except Exception as e:
-        print(f"Erro ao salvar coordenada: {e}")
+        logger.exception("Erro ao salvar coordenada")
         raise Exception(f"Erro ao salvar coordenada: {str(e)}")
+    
+    if not saved:
+        debug_sampled(logger, "Imagem %s não encontrada no banco de dados", image_id, image_id=image_id)
+        raise Exception("Imagem não encontrada")
+    
+    debug_sampled(logger, "Coordenada salva com sucesso, ID: %s", saved["id"], image_id=image_id, coordinate_id=saved["id"])
+    
+    return {
+        "id": saved["id"],
+        "image_id": image_id,
+        "name": coordinate.name,
+        "x": coordinate.x,
+        "y": coordinate.y,
+        "page": coordinate.page,
+        "created_at": created_at,
+        "source": saved["source"]
+    }
 
 def delete_coordinate(coordinate_id: int):
     """Remove uma coordenada salva"""
-    print(f"Removendo coordenada {coordinate_id}")
     try:
-        rows_affected = execute_db_query(
-            "DELETE FROM saved_coordinates WHERE id = ?", 
+        deleted = execute_db_query(
+            "DELETE FROM saved_coordinates WHERE id = ? RETURNING id", 
             (coordinate_id,),
+            fetch_one=True,
             commit=True
         )
         
-        if not rows_affected:
-            print(f"Coordenada {coordinate_id} não encontrada para remoção")
+        if not deleted:
             raise Exception("Coordenada não encontrada")
         
-        print(f"Coordenada {coordinate_id} removida com sucesso")
+        debug_sampled(logger, "Coordenada %s removida", coordinate_id, coordinate_id=coordinate_id)
         return {"success": True}
     except Exception as e:
-        print(f"Erro ao remover coordenada: {e}")
-        raise Exception(f"Erro ao remover coordenada: {str(e)}") 
\ No newline at end of file
+        logger.exception("Erro ao remover coordenada")
+        raise Exception(f"Erro ao remover coordenada: {str(e)}")
+
+def encode_cursor(created_at, coordinate_id):
+    """Cursor opaco com a posição (created_at, id) do último item retornado"""
+    return base64.urlsafe_b64encode(json.dumps([created_at, coordinate_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    """Decodifica um cursor gerado por encode_cursor; levanta ValueError se for inválido"""
+    try:
+        created_at, coordinate_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), int(coordinate_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+def _like_pattern(term):
+    """Padrão LIKE de substring, escapando os curingas digitados pelo usuário"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+async def get_coordinates_page(limit=100, cursor=None, q=None, name=None, source=None, image_id=None, page=None):
+    """Busca uma página de coordenadas (mais recentes primeiro) com paginação por cursor em (created_at, id)"""
+    conditions = []
+    params = []
+    
+    # Keyset: continua logo após o último item da página anterior, sem OFFSET
+    if cursor:
+        conditions.append("(sc.created_at, sc.id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    if image_id:
+        conditions.append("sc.image_id = ?")
+        params.append(image_id)
+    if page is not None:
+        conditions.append("sc.page = ?")
+        params.append(page)
+    if name:
+        conditions.append("sc.name LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(name))
+    if source:
+        conditions.append("COALESCE(NULLIF(sc.source, ''), pi.filename) LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(source))
+    if q:
+        conditions.append("(sc.name LIKE ? ESCAPE '\\' OR COALESCE(NULLIF(sc.source, ''), pi.filename) LIKE ? ESCAPE '\\')")
+        params.extend([_like_pattern(q), _like_pattern(q)])
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = await execute_db_query_async(
+        f"""
+        SELECT sc.*, pi.filename 
+        FROM saved_coordinates sc
+        JOIN processed_images pi ON sc.image_id = pi.id
+        {where}
+        ORDER BY sc.created_at DESC, sc.id DESC
+        LIMIT ?
+        """,
+        (*params, limit + 1),
+        fetch_all=True
+    )
+    
+    # Uma linha a mais indica que existe próxima página
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    items = []
+    for row in rows:
+        source_value = row["source"] if row["source"] else row["filename"]
+        items.append({
+            "id": row["id"],
+            "image_id": row["image_id"],
+            "name": row["name"],
+            "x": row["x"],
+            "y": row["y"],
+            "page": row["page"],
+            "created_at": row["created_at"],
+            "source": source_value,
+            "filename": row["filename"]
+        })
+    
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None,
+        "limit": limit
+    }
+
+def build_fts_query(text):
+    """Converte o texto digitado em uma consulta FTS5: cada termo vira um prefixo e todos precisam casar"""
+    terms = re.findall(r"\w+", text)
+    return " ".join(f'"{term}"*' for term in terms)
+
+async def search_coordinates(q, image_id=None, page=None, limit=50):
+    """Busca coordenadas por nome ou fonte no índice FTS5, ordenadas por relevância (bm25)"""
+    match = build_fts_query(q)
+    if not match:
+        raise ValueError("Informe ao menos uma palavra para a busca")
+    
+    conditions = ["saved_coordinates_fts MATCH ?"]
+    params = [match]
+    if image_id:
+        conditions.append("sc.image_id = ?")
+        params.append(image_id)
+    if page is not None:
+        conditions.append("sc.page = ?")
+        params.append(page)
+    
+    rows = await execute_db_query_async(
+        f"""
+        SELECT sc.*, pi.filename, saved_coordinates_fts.rank AS rank
+        FROM saved_coordinates_fts
+        JOIN saved_coordinates sc ON sc.id = saved_coordinates_fts.rowid
+        JOIN processed_images pi ON pi.id = sc.image_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY saved_coordinates_fts.rank
+        LIMIT ?
+        """,
+        (*params, limit),
+        fetch_all=True
+    )
+    
+    result = []
+    for row in rows:
+        source = row["source"] if row["source"] else row["filename"]
+        result.append({
+            "id": row["id"],
+            "image_id": row["image_id"],
+            "name": row["name"],
+            "x": row["x"],
+            "y": row["y"],
+            "page": row["page"],
+            "created_at": row["created_at"],
+            "source": source,
+            "filename": row["filename"],
+            "score": -row["rank"]
+        })
+    
+    return result
+
+# Pontos cujas caixas no R*Tree cruzam a região; o R*Tree guarda floats de 32 bits
+# (arredondados para fora), então a comparação exata é refeita em saved_coordinates.
+# Isso vale também para a chave da página: acima de 2^24 chaves vizinhas caem no mesmo
+# float, por isso a imagem e a página da linha são conferidas
+RTREE_REGION_QUERY = """
+    SELECT sc.*
+    FROM saved_coordinates_rtree r
+    JOIN saved_coordinates sc ON sc.id = r.id
+    WHERE r.min_plane <= ? AND r.max_plane >= ?
+      AND r.max_x >= ? AND r.min_x <= ?
+      AND r.max_y >= ? AND r.min_y <= ?
+      AND sc.image_id = ? AND sc.page = ?
+      AND sc.x BETWEEN ? AND ?
+      AND sc.y BETWEEN ? AND ?
+"""
+
+# Raio inicial da busca do ponto mais próximo (em coordenadas do visualizador, onde a
+# largura da página é 1) e raio máximo quando o cliente não informa max_distance
+NEAREST_START_RADIUS = 0.01
+NEAREST_MAX_RADIUS = 1024.0
+
+def _coordinate_item(row):
+    return {
+        "id": row["id"],
+        "image_id": row["image_id"],
+        "name": row["name"],
+        "x": row["x"],
+        "y": row["y"],
+        "page": row["page"],
+        "created_at": row["created_at"],
+        "source": row["source"] if row["source"] else ""
+    }
+
+def _page_key(conn, image_id, page):
+    row = conn.execute(
+        "SELECT key FROM coordinate_pages WHERE image_id = ? AND page = ?",
+        (image_id, page)
+    ).fetchone()
+    return row["key"] if row else None
+
+def _query_region(conn, key, image_id, page, x0, y0, x1, y1, limit=None):
+    query = RTREE_REGION_QUERY
+    params = (key, key, x0, x1, y0, y1, image_id, page, x0, x1, y0, y1)
+    if limit is not None:
+        query += " LIMIT ?"
+        params += (limit,)
+    return conn.execute(query, params).fetchall()
+
+def _find_in_region(image_id, page, x0, y0, x1, y1, limit):
+    with get_db_connection() as conn:
+        key = _page_key(conn, image_id, page)
+        if key is None:
+            return []
+        rows = _query_region(conn, key, image_id, page, x0, y0, x1, y1, limit)
+    return [_coordinate_item(row) for row in rows]
+
+def _find_nearest(image_id, page, x, y, k, max_distance):
+    max_radius = max_distance if max_distance is not None else NEAREST_MAX_RADIUS
+    with get_db_connection() as conn:
+        key = _page_key(conn, image_id, page)
+        if key is None:
+            return []
+        
+        # Expande a caixa de busca até ter k pontos dentro do raio: todo ponto a uma
+        # distância <= radius está na caixa, então os k mais próximos já são definitivos
+        radius = min(NEAREST_START_RADIUS, max_radius)
+        while True:
+            rows = _query_region(conn, key, image_id, page, x - radius, y - radius, x + radius, y + radius)
+            candidates = sorted(
+                ((math.hypot(row["x"] - x, row["y"] - y), row) for row in rows),
+                key=lambda candidate: candidate[0]
+            )
+            candidates = [candidate for candidate in candidates if candidate[0] <= radius]
+            if len(candidates) >= k or radius >= max_radius:
+                break
+            radius = min(radius * 2, max_radius)
+    
+    return [{**_coordinate_item(row), "distance": distance} for distance, row in candidates[:k]]
+
+async def get_coordinates_in_region(image_id, page, x0, y0, x1, y1, limit=5000):
+    """Busca as coordenadas de uma página dentro do retângulo (x0, y0)-(x1, y1) usando o índice espacial"""
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    return await run_db_async(_find_in_region, image_id, page, x0, y0, x1, y1, limit)
+
+async def get_nearest_coordinates(image_id, page, x, y, k=1, max_distance=None):
+    """Busca as k coordenadas mais próximas de (x, y) em uma página, ordenadas pela distância"""
+    return await run_db_async(_find_nearest, image_id, page, x, y, k, max_distance)
+
+def read_coordinates_csv(text_stream):
+    """Lê um CSV no formato da exportação e retorna um gerador com um registro (formato da API) por linha"""
+    reader = csv.DictReader(text_stream)
+    missing = [column for column in CSV_REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(missing)}")
+    
+    def records():
+        for row in reader:
+            source = (row.get("fonte") or "").strip()
+            yield {
+                "name": row["nome"],
+                "x": row["x"],
+                "y": row["y"],
+                "page": row["pagina"],
+                "source": None if source == CSV_UNKNOWN_SOURCE else source,
+                "created_at": row.get("data_criacao")
+            }
+    
+    return records()
+
+def _format_import_error(error):
+    if hasattr(error, "errors"):
+        return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors())
+    return str(error)
+
+def _import_row(image_id, default_source, record, now):
+    if not isinstance(record, dict):
+        raise ValueError("O registro deve ser um objeto")
+    created_at = record.get("created_at")
+    created_at = datetime.fromisoformat(created_at).isoformat() if created_at else now
+    coordinate = CoordinateCreate(**{key: value for key, value in record.items() if key != "created_at"})
+    return (
+        image_id,
+        coordinate.name,
+        coordinate.x,
+        coordinate.y,
+        coordinate.page,
+        created_at,
+        coordinate.source or default_source
+    )
+
+def import_coordinates(image_id, default_source, records):
+    """
+    Valida e insere coordenadas em lote, em uma única transação. Gera uma linha NDJSON
+    para cada registro inválido (numerados a partir de 1) e um resumo no final
+    """
+    rows = []
+    failed = 0
+    now = datetime.now().isoformat()
+    try:
+        for index, record in enumerate(records, start=1):
+            try:
+                rows.append(_import_row(image_id, default_source, record, now))
+            except (ValueError, TypeError) as e:
+                failed += 1
+                yield json.dumps({"row": index, "error": _format_import_error(e)}, ensure_ascii=False) + "\n"
+        
+        # Todos os registros válidos entram juntos: um único commit (e um único fsync)
+        if rows:
+            with get_db_connection() as conn:
+                conn.executemany(IMPORT_COORDINATE_QUERY, rows)
+                conn.commit()
+            response_cache.invalidate(image_coordinates_key(image_id))
+    except Exception as e:
+        logger.exception("Erro na importação de coordenadas para imagem %s", image_id, extra={"image_id": image_id})
+        yield json.dumps({"inserted": 0, "failed": failed, "error": str(e)}, ensure_ascii=False) + "\n"
+        return
+    
+    logger.info(
+        "Importadas %d coordenadas para imagem %s (%d inválidas)", len(rows), image_id, failed,
+        extra={"image_id": image_id, "inserted": len(rows), "failed": failed}
+    )
+    yield json.dumps({"inserted": len(rows), "failed": failed}) + "\n"
@@ -0,0 +1,192 @@
+"""
+Exportação de coordenadas em streaming.
+
+As linhas são lidas em blocos por keyset (image_id, created_at, id), cada bloco em uma
+conexão do pool obtida só durante a query: um download lento não prende conexões e a
+memória usada não depende do tamanho da exportação.
+"""
+import csv
+import zlib
+from datetime import datetime
+from io import StringIO
+from ..core.config import EXPORT_CHUNK_SIZE
+from ..db.database import execute_db_query
+from .coordinate_service import CSV_COLUMNS, CSV_UNKNOWN_SOURCE
+
+# Colunas acrescentadas ao CSV quando a exportação inclui várias imagens
+CSV_MULTI_IMAGE_COLUMNS = ["imagem_id", "arquivo"]
+
+# Todas as coordenadas, por keyset (image_id, created_at, id) no índice (image_id, created_at)
+_EXPORT_ALL_QUERY = """
+    SELECT sc.*, pi.filename
+    FROM saved_coordinates sc
+    JOIN processed_images pi ON pi.id = sc.image_id
+    WHERE (sc.image_id, sc.created_at, sc.id) > (?, ?, ?)
+    ORDER BY sc.image_id, sc.created_at, sc.id
+    LIMIT ?
+"""
+
+# Coordenadas de uma imagem; com IN (...) o SQLite precisaria ordenar todas as linhas
+# das imagens a cada bloco, então as imagens são percorridas uma por vez
+_EXPORT_IMAGE_QUERY = """
+    SELECT sc.*, pi.filename
+    FROM saved_coordinates sc
+    JOIN processed_images pi ON pi.id = sc.image_id
+    WHERE sc.image_id = ? AND (sc.created_at, sc.id) > (?, ?)
+    ORDER BY sc.created_at, sc.id
+    LIMIT ?
+"""
+
+def _iter_keyset(query, params, chunk_size):
+    last = ("", 0)
+    while True:
+        rows = execute_db_query(query, (*params, *last, chunk_size), fetch_all=True)
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1]["created_at"], rows[-1]["id"])
+
+def iter_coordinate_chunks(image_ids=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Gera blocos de coordenadas (com o filename da imagem) das imagens indicadas, ou de todas"""
+    if image_ids:
+        for image_id in sorted(set(image_ids)):
+            yield from _iter_keyset(_EXPORT_IMAGE_QUERY, (image_id,), chunk_size)
+        return
+    
+    last = ("", "", 0)
+    while True:
+        rows = execute_db_query(_EXPORT_ALL_QUERY, (*last, chunk_size), fetch_all=True)
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1]["image_id"], rows[-1]["created_at"], rows[-1]["id"])
+
+def stream_coordinates_csv(image_ids=None, multi_image=False):
+    """Gera o CSV de exportação em bytes, um bloco de linhas por vez"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS + CSV_MULTI_IMAGE_COLUMNS if multi_image else CSV_COLUMNS)
+    
+    for rows in iter_coordinate_chunks(image_ids):
+        for row in rows:
+            record = [
+                row["id"],
+                row["name"],
+                row["x"],
+                row["y"],
+                row["page"],
+                row["created_at"],
+                row["source"] if row["source"] else CSV_UNKNOWN_SOURCE
+            ]
+            if multi_image:
+                record += [row["image_id"], row["filename"]]
+            writer.writerow(record)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    
+    # Sem coordenadas, o cabeçalho ainda está no buffer
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def gzip_stream(chunks):
+    """Comprime em gzip, em streaming, um gerador de blocos de bytes"""
+    # wbits=31 gera o formato gzip (cabeçalho e CRC) em vez de zlib puro
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+# Formatos colunares: tipo MIME e extensão do arquivo
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+class _ChunkSink:
+    """Destino de escrita do pyarrow que acumula os bytes até serem enviados ao cliente"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def stream_coordinates_columnar(export_format, image_ids=None):
+    """
+    Retorna um gerador com a exportação em Parquet ou Arrow IPC (formato de arquivo/Feather),
+    escrita em record batches de EXPORT_CHUNK_SIZE linhas. Requer o pyarrow (ImportError sem ele)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("image_id", pa.string()),
+        ("filename", pa.string()),
+        ("name", pa.string()),
+        ("x", pa.float64()),
+        ("y", pa.float64()),
+        ("page", pa.int32()),
+        ("created_at", pa.timestamp("us")),
+        ("source", pa.string()),
+    ])
+    
+    def to_batch(rows):
+        return pa.record_batch([
+            pa.array([row["id"] for row in rows], pa.int64()),
+            pa.array([row["image_id"] for row in rows], pa.string()),
+            pa.array([row["filename"] for row in rows], pa.string()),
+            pa.array([row["name"] for row in rows], pa.string()),
+            pa.array([row["x"] for row in rows], pa.float64()),
+            pa.array([row["y"] for row in rows], pa.float64()),
+            pa.array([row["page"] for row in rows], pa.int32()),
+            pa.array([_parse_timestamp(row["created_at"]) for row in rows], pa.timestamp("us")),
+            pa.array([row["source"] or None for row in rows], pa.string()),
+        ], schema=schema)
+    
+    def chunks():
+        sink = _ChunkSink()
+        output = pa.PythonFile(sink, mode="w")
+        if export_format == "parquet":
+            writer = pq.ParquetWriter(output, schema)
+        else:
+            writer = pa.ipc.new_file(output, schema)
+        
+        for rows in iter_coordinate_chunks(image_ids):
+            writer.write_batch(to_batch(rows))
+            data = sink.drain()
+            if data:
+                yield data
+        writer.close()
+        yield sink.drain()
+    
+    return chunks()
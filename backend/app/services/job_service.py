@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from ..core.config import JOB_WORKERS, JOB_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Pool de workers que executa a rasterização fora do event loop
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="pdf-job")
+
+# Estado dos jobs em memória, protegido por lock. É por processo: com várias réplicas (ou
+# workers), /jobs/{id} só encontra o job na réplica que recebeu o upload e find_active_job
+# não deduplica uploads simultâneos do mesmo PDF enviados a réplicas diferentes
+_jobs = {}
+_lock = threading.Lock()
+
+def _prune_finished_jobs():
+    """Remove jobs finalizados há mais tempo que o período de retenção"""
+    limit = time.time() - JOB_RETENTION_SECONDS
+    for job_id in list(_jobs):
+        finished = _jobs[job_id].get("_finished_ts")
+        if finished and finished < limit:
+            del _jobs[job_id]
+
+def create_job(session_id, filename, content_hash=None):
+    """Registra um novo job na fila e retorna seu ID"""
+    job_id = str(uuid.uuid4())
+    with _lock:
+        _prune_finished_jobs()
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "session_id": session_id,
+            "filename": filename,
+            "content_hash": content_hash,
+            "status": "queued",
+            "page_count": None,
+            "pages_done": 0,
+            "pages": [],
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None
+        }
+    return job_id
+
+def get_job(job_id):
+    """Retorna uma cópia do estado atual de um job"""
+    with _lock:
+        job = _jobs.get(job_id)
+        if not job:
+            return None
+        result = {key: value for key, value in job.items() if not key.startswith("_")}
+        result["pages"] = sorted(job["pages"], key=lambda page: page["page_num"])
+        return result
+
+def active_session_ids():
+    """IDs das sessões com jobs ainda na fila ou em processamento"""
+    with _lock:
+        return {job["session_id"] for job in _jobs.values() if job["status"] in ("queued", "processing")}
+
+def find_active_job(content_hash):
+    """Retorna o ID de um job ainda em andamento para o mesmo conteúdo, se houver"""
+    with _lock:
+        for job in _jobs.values():
+            if job["content_hash"] == content_hash and job["status"] in ("queued", "processing"):
+                return job["job_id"]
+    return None
+
+def _update_job(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields)
+
+def _report_progress(job_id, page_info, page_count):
+    """Callback chamado a cada página renderizada"""
+    with _lock:
+        job = _jobs[job_id]
+        job["page_count"] = page_count
+        job["pages"].append(page_info)
+        job["pages_done"] = len(job["pages"])
+
+def _run_job(job_id, func, args):
+    _update_job(job_id, status="processing", started_at=datetime.now().isoformat())
+    try:
+        func(*args, progress_callback=lambda page_info, page_count: _report_progress(job_id, page_info, page_count))
+        _update_job(job_id, status="completed")
+    except Exception as e:
+        logger.exception("Erro no job %s", job_id, extra={"job_id": job_id})
+        _update_job(job_id, status="failed", error=str(e))
+    finally:
+        _update_job(job_id, finished_at=datetime.now().isoformat(), _finished_ts=time.time())
+
+def submit_job(job_id, func, *args):
+    """Envia a função para o pool; ela recebe um progress_callback(page_info, page_count)"""
+    _executor.submit(_run_job, job_id, func, args)
@@ -0,0 +1,329 @@
+"""
+Armazenamento dos PDFs e das páginas pré-renderizadas, por sessão (chaves "{session_id}/{arquivo}").
+
+- LocalPageStore: os arquivos ficam em UPLOAD_DIR, onde o upload já é gravado e rasterizado.
+- S3PageStore: bucket compatível com S3 (AWS, MinIO), compartilhado entre réplicas do backend.
+  O upload é gravado e rasterizado em UPLOAD_DIR (área local) e publicado no bucket ao final;
+  as leituras passam pelo cache de renderização local (read-through, limitado em bytes), e as
+  páginas podem ser entregues por URL pré-assinada.
+
+Os dois expõem local_path(chave), que retorna um arquivo local pronto para o fitz ou para o
+FileResponse, de modo que o resto do código não depende do driver. O session_id vem da URL:
+chaves cuja sessão não é um UUID (ex.: "..") são tratadas como inexistentes, sem tocar no disco.
+"""
+import mimetypes
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from ..core.config import (
+    UPLOAD_DIR, RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES, STORAGE_BACKEND,
+    S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION, S3_PRESIGN_EXPIRES_SECONDS
+)
+from .render_cache import RenderCache
+
+# Cache em disco das páginas renderizadas sob demanda e, com o S3, das cópias locais dos objetos
+render_cache = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES)
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+def is_session_id(value):
+    """Ids de sessão são UUIDs gerados no upload (str(uuid.uuid4()))"""
+    try:
+        return str(uuid.UUID(value)) == value
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+def _is_valid_key(key):
+    """Chave "{session_id}/{arquivo}" com sessão válida e nome de arquivo simples"""
+    session_id, _, name = key.partition("/")
+    return is_session_id(session_id) and name not in ("", ".", "..") and "/" not in name and "\\" not in name
+
+def _is_pdf(name):
+    return name.lower().endswith(".pdf")
+
+def _empty_usage():
+    return {"bytes": 0, "pdf_bytes": 0, "files": 0, "modified_at": 0.0}
+
+def _add_usage(usage, name, size, modified_at):
+    usage["bytes"] += size
+    usage["files"] += 1
+    if _is_pdf(name):
+        usage["pdf_bytes"] += size
+    usage["modified_at"] = max(usage["modified_at"], modified_at)
+
+class LocalPageStore:
+    """Arquivos em UPLOAD_DIR/{session_id}; a área de upload é o próprio armazenamento"""
+    backend = "local"
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._real_root = os.path.realpath(root)
+
+    def _inside_root(self, path):
+        return os.path.realpath(path).startswith(self._real_root + os.sep)
+
+    def _session_dir(self, session_id):
+        """Diretório da sessão, ou None se o id não for válido"""
+        if not is_session_id(session_id):
+            return None
+        path = os.path.join(self.root, session_id)
+        return path if self._inside_root(path) else None
+
+    def _path(self, key):
+        """Caminho do arquivo sob UPLOAD_DIR, ou None se a chave não for válida"""
+        if not _is_valid_key(key):
+            return None
+        path = os.path.join(self.root, key)
+        return path if self._inside_root(path) else None
+
+    def staging_dir(self, session_id):
+        """Diretório local onde o upload é gravado e rasterizado"""
+        return os.path.join(self.root, session_id)
+
+    def publish_session(self, session_id, staging_dir):
+        """Torna os arquivos da sessão visíveis no armazenamento (aqui, já estão)"""
+
+    def list_session(self, session_id):
+        """Arquivos de uma sessão: {nome: tamanho}"""
+        session_dir = self._session_dir(session_id)
+        if not session_dir or not os.path.isdir(session_dir):
+            return {}
+        with os.scandir(session_dir) as entries:
+            return {entry.name: entry.stat().st_size for entry in entries if entry.is_file()}
+
+    def local_path(self, key):
+        path = self._path(key)
+        return path if path and os.path.isfile(path) else None
+
+    def open(self, key):
+        """Abre um arquivo para leitura em streaming"""
+        path = self._path(key)
+        if not path:
+            raise FileNotFoundError(key)
+        return open(path, "rb")
+
+    def download_url(self, key):
+        """Sem URL externa: os arquivos locais são servidos pelo backend"""
+        return None
+
+    def delete(self, key):
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def delete_session(self, session_id):
+        session_dir = self._session_dir(session_id)
+        if session_dir:
+            shutil.rmtree(session_dir, ignore_errors=True)
+
+    def usage(self):
+        """Uso por sessão: {session_id: {bytes, pdf_bytes, files, modified_at}}"""
+        sessions = {}
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False) or not is_session_id(entry.name):
+                    continue
+                usage = sessions[entry.name] = _empty_usage()
+                usage["modified_at"] = entry.stat().st_mtime
+                for dirpath, _, filenames in os.walk(entry.path):
+                    for filename in filenames:
+                        try:
+                            stat = os.stat(os.path.join(dirpath, filename))
+                        except FileNotFoundError:
+                            continue
+                        _add_usage(usage, filename, stat.st_size, stat.st_mtime)
+        return sessions
+
+    def remove_stale_staging(self, max_age_seconds, keep):
+        """A área de upload é o armazenamento: os órfãos são tratados pela coleta de lixo"""
+        return []
+
+    def describe(self):
+        return {"backend": self.backend, "root": self.root}
+
+class S3PageStore:
+    """Bucket compatível com S3; leituras via cache local e downloads por URL pré-assinada"""
+    backend = "s3"
+
+    # Listagens de sessão guardadas em memória (sessões não mudam depois de publicadas)
+    LISTING_TTL_SECONDS = 300
+    LISTING_MAX_SESSIONS = 1024
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, region=None, staging_root=UPLOAD_DIR, cache=render_cache):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        if not bucket:
+            raise ValueError("S3_BUCKET é obrigatório com STORAGE_BACKEND=s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.staging_root = staging_root
+        self.cache = cache
+        # Credenciais pela cadeia padrão do boto3 (AWS_ACCESS_KEY_ID, perfil, IAM role)
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self._client_error = ClientError
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+        self._upload_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="s3-upload")
+        os.makedirs(staging_root, exist_ok=True)
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def staging_dir(self, session_id):
+        return os.path.join(self.staging_root, session_id)
+
+    def publish_session(self, session_id, staging_dir):
+        """
+        Envia os arquivos da sessão ao bucket e os move para o cache local (a sessão recém-enviada
+        costuma ser aberta em seguida); a área de upload é removida
+        """
+        names = sorted(name for name in os.listdir(staging_dir) if os.path.isfile(os.path.join(staging_dir, name)))
+
+        def upload(name):
+            path = os.path.join(staging_dir, name)
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            self.client.upload_file(path, self.bucket, self._object_key(f"{session_id}/{name}"), ExtraArgs={"ContentType": content_type})
+            return name, os.path.getsize(path)
+
+        listing = dict(self._upload_pool.map(upload, names))
+        for name in names:
+            self.cache.put(f"{session_id}/{name}", os.path.join(staging_dir, name))
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        self._remember(session_id, listing)
+
+    def _remember(self, session_id, listing):
+        with self._lock:
+            self._listings[session_id] = (time.monotonic() + self.LISTING_TTL_SECONDS, listing)
+            self._listings.move_to_end(session_id)
+            while len(self._listings) > self.LISTING_MAX_SESSIONS:
+                self._listings.popitem(last=False)
+
+    def _iter_objects(self, prefix):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix)):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):], item
+
+    def list_session(self, session_id):
+        if not is_session_id(session_id):
+            return {}
+        with self._lock:
+            cached = self._listings.get(session_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+        listing = {key.split("/", 1)[1]: item["Size"] for key, item in self._iter_objects(f"{session_id}/")}
+        # Sessão vazia não é guardada: ela pode ser publicada por outra réplica a qualquer momento
+        if listing:
+            self._remember(session_id, listing)
+        return listing
+
+    def _exists(self, key):
+        session_id, _, name = key.partition("/")
+        return _is_valid_key(key) and name in self.list_session(session_id)
+
+    def local_path(self, key):
+        """Cópia local do objeto, baixada para o cache de renderização no primeiro acesso"""
+        # A chave também vira caminho no cache local
+        if not _is_valid_key(key):
+            return None
+        path = self.cache.get(key)
+        if path:
+            return path
+        if not self._exists(key):
+            return None
+
+        def download(tmp_path):
+            with closing(self.open(key)) as body, open(tmp_path, "wb") as file:
+                shutil.copyfileobj(body, file, STREAM_CHUNK_SIZE)
+
+        try:
+            return self.cache.get_or_create(key, download)
+        except FileNotFoundError:
+            return None
+
+    def open(self, key):
+        """Corpo do objeto para leitura em streaming (FileNotFoundError se não existir)"""
+        if not _is_valid_key(key):
+            raise FileNotFoundError(key)
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def download_url(self, key):
+        """URL pré-assinada do objeto, ou None se ele não estiver no bucket"""
+        if not self._exists(key):
+            return None
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=S3_PRESIGN_EXPIRES_SECONDS
+        )
+
+    def delete(self, key):
+        if not _is_valid_key(key):
+            return
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        session_id = key.split("/", 1)[0]
+        with self._lock:
+            self._listings.pop(session_id, None)
+
+    def delete_session(self, session_id):
+        if not is_session_id(session_id):
+            return
+        keys = [self._object_key(key) for key, _ in self._iter_objects(f"{session_id}/")]
+        # delete_objects aceita até 1000 chaves por chamada
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True}
+            )
+        with self._lock:
+            self._listings.pop(session_id, None)
+
+    def usage(self):
+        sessions = {}
+        for key, item in self._iter_objects(""):
+            session_id, _, name = key.partition("/")
+            if not name or not is_session_id(session_id):
+                continue
+            usage = sessions.setdefault(session_id, _empty_usage())
+            _add_usage(usage, name, item["Size"], item["LastModified"].timestamp())
+        return sessions
+
+    def remove_stale_staging(self, max_age_seconds, keep):
+        """Remove áreas de upload abandonadas (ex.: processo interrompido antes da publicação)"""
+        removed = []
+        limit = time.time() - max_age_seconds
+        with os.scandir(self.staging_root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and entry.name not in keep and entry.stat().st_mtime < limit:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed.append(entry.name)
+        return removed
+
+    def describe(self):
+        return {"backend": self.backend, "bucket": self.bucket, "prefix": self.prefix, "endpoint_url": S3_ENDPOINT_URL}
+
+def create_page_store():
+    """Cria o armazenamento configurado em STORAGE_BACKEND"""
+    if STORAGE_BACKEND == "local":
+        return LocalPageStore(UPLOAD_DIR)
+    if STORAGE_BACKEND == "s3":
+        return S3PageStore(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION)
+    raise ValueError(f"STORAGE_BACKEND desconhecido: {STORAGE_BACKEND}")
+
+page_store = create_page_store()
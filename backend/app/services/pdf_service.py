@@ -1,64 +1,303 @@
 import fitz  # PyMuPDF
+import hashlib
+import json
+import math
+import multiprocessing
 import os
+import re
 import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from ..core.config import RENDER_WORKERS, RENDER_PROFILES
+from ..core.metrics import PAGE_RENDER_DURATION, PAGE_RENDER_BYTES
 from ..db.database import execute_db_query
+from .page_store import page_store, render_cache, is_session_id
+from .text_service import index_pdf_text
+from .response_cache import response_cache, HISTORY_KEY, image_info_key
 
-# Diretório para armazenar arquivos processados
-UPLOAD_DIR = "/app/uploads"  # Caminho absoluto no container
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Pools de processos de renderização, criados sob demanda por número de workers
+_render_pools = {}
+_render_pools_lock = threading.Lock()
 
-def convert_pdf_to_images(pdf_path, output_dir, dpi=300):
-    """Converte PDF em imagens de alta resolução"""
+def page_image_name(page_num, profile="full"):
+    """Nome do arquivo de uma variante de página (a variante "full" mantém o nome page_N.png)"""
+    extension = "jpg" if RENDER_PROFILES[profile]["format"] == "jpeg" else "png"
+    if profile == "full":
+        return f"page_{page_num}.{extension}"
+    return f"page_{page_num}_{profile}.{extension}"
+
+def profile_signature(profile, dpi=300):
+    """Resumo das configurações de renderização do perfil (muda com PREVIEW_DPI, THUMBNAIL_* etc.)"""
+    settings = json.dumps({"dpi": dpi, **RENDER_PROFILES[profile]}, sort_keys=True)
+    return hashlib.sha1(settings.encode("utf-8")).hexdigest()[:12]
+
+def stored_image_name(page_num, profile="full", dpi=300):
+    """
+    Nome do arquivo de uma variante no armazenamento e no cache de renderização: inclui a
+    assinatura do perfil, para que imagens geradas com outras configurações nunca sejam
+    servidas com o ETag das configurações atuais
+    """
+    name, extension = page_image_name(page_num, profile).rsplit(".", 1)
+    return f"{name}.{profile_signature(profile, dpi)}.{extension}"
+
+def parse_page_image_name(image_name):
+    """Extrai (página, perfil) de um nome como page_3.png ou page_3_preview.jpg"""
+    match = re.fullmatch(r"page_(\d+)(?:_([a-z0-9]+))?\.(png|jpg)", image_name)
+    if not match:
+        return None
+    page_num, profile = int(match.group(1)), match.group(2) or "full"
+    if profile not in RENDER_PROFILES or page_image_name(page_num, profile) != image_name:
+        return None
+    return page_num, profile
+
+def _profile_matrix(page_rect, profile, dpi):
+    """Matriz de renderização do perfil; perfis sem DPI próprio usam a resolução completa"""
+    settings = RENDER_PROFILES[profile]
+    if "max_size" in settings:
+        zoom = settings["max_size"] / max(page_rect.width, page_rect.height)
+    else:
+        zoom = settings.get("dpi", dpi) / 72
+    return fitz.Matrix(zoom, zoom)
+
+def _render_variant(page, path, profile, dpi):
+    """Renderiza uma página no perfil indicado e salva no formato do perfil; retorna (segundos, bytes)"""
+    start = time.perf_counter()
+    pix = page.get_pixmap(matrix=_profile_matrix(page.rect, profile, dpi))
+    if RENDER_PROFILES[profile]["format"] == "jpeg":
+        pix.save(path, output="jpeg", jpg_quality=RENDER_PROFILES[profile].get("quality", 85))
+    else:
+        pix.save(path, output="png")
+    return time.perf_counter() - start, os.path.getsize(path)
+
+def _observe_render(profile, seconds, size):
+    PAGE_RENDER_DURATION.observe(seconds, profile)
+    PAGE_RENDER_BYTES.inc(profile, amount=size)
+
+def _page_info(page, session_id, dpi):
+    """Informações de uma página, com dimensões calculadas a partir de page.rect"""
+    page_num = page.number + 1
+    variants = {}
+    for profile in RENDER_PROFILES:
+        size = (page.rect * _profile_matrix(page.rect, profile, dpi)).irect
+        variants[profile] = {
+            "path": f"/images/{session_id}/{page_image_name(page_num, profile)}",
+            "width": size.width,
+            "height": size.height
+        }
+    return {
+        "page_num": page_num,
+        "width": variants["full"]["width"],
+        "height": variants["full"]["height"],
+        "path": variants["full"]["path"],
+        "tiles": f"/tiles/{session_id}/{page_num}",
+        "thumbnail": f"/thumbnails/{session_id}/{page_num}",
+        "variants": variants
+    }
+
+def _render_page(doc, page_num, output_dir, dpi, profiles):
+    """
+    Renderiza uma página em cada perfil pedido e retorna (informações da página, medições),
+    com uma medição (perfil, segundos, bytes) por perfil. As medições voltam para o processo
+    principal porque as métricas dos processos de renderização não são expostas
+    """
+    page = doc.load_page(page_num)
+    
+    # Salva uma imagem por perfil
+    stats = []
+    for profile in profiles:
+        seconds, size = _render_variant(page, os.path.join(output_dir, stored_image_name(page_num + 1, profile, dpi)), profile, dpi)
+        stats.append((profile, seconds, size))
+    
+    # Informações sobre a imagem
+    return _page_info(page, os.path.basename(output_dir), dpi), stats
+
+def _render_pages(pdf_path, output_dir, dpi, profiles, page_numbers):
+    """Renderiza um lote de páginas; executado em um processo do pool, com seu próprio documento"""
     doc = fitz.open(pdf_path)
-    images_info = []
+    try:
+        return [_render_page(doc, page_num, output_dir, dpi, profiles) for page_num in page_numbers]
+    finally:
+        doc.close()
+
+def _get_render_pool(workers):
+    """Retorna (criando se necessário) o pool de processos de renderização"""
+    with _render_pools_lock:
+        pool = _render_pools.get(workers)
+        if pool is None:
+            # "spawn" evita herdar locks das threads do servidor no fork
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _render_pools[workers] = pool
+        return pool
+
+def convert_pdf_to_images(pdf_path, output_dir, dpi=300, progress_callback=None, workers=None, profiles=("full",)):
+    """Converte PDF em imagens, uma por perfil de renderização (padrão: alta resolução em PNG)"""
+    if workers is None:
+        workers = RENDER_WORKERS
     
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        
-        # Renderiza página como imagem com alta resolução
-        pix = page.get_pixmap(matrix=fitz.Matrix(dpi/72, dpi/72))
-        
-        # Salva a imagem
-        image_name = f"page_{page_num+1}.png"
-        image_path = os.path.join(output_dir, image_name)
-        pix.save(image_path)
-        
-        # Informações sobre a imagem
-        images_info.append({
-            "page_num": page_num + 1,
-            "width": pix.width,
-            "height": pix.height,
-            "path": f"/images/{os.path.basename(output_dir)}/{image_name}"
-        })
+    doc = fitz.open(pdf_path)
+    page_count = len(doc)
+    workers = min(workers, page_count)
+    
+    # Caminho serial: renderiza página a página no processo atual
+    if workers <= 1:
+        images_info = []
+        try:
+            for page_num in range(page_count):
+                page_info, stats = _render_page(doc, page_num, output_dir, dpi, profiles)
+                for stat in stats:
+                    _observe_render(*stat)
+                images_info.append(page_info)
+                
+                # Informa o progresso página a página (usado pela fila de jobs)
+                if progress_callback:
+                    progress_callback(page_info, page_count)
+        finally:
+            doc.close()
+        return images_info
+    doc.close()
+    
+    # Caminho paralelo: divide as páginas em lotes contíguos entre os processos.
+    # Lotes menores que page_count/workers equilibram a carga e dão progresso mais fino.
+    shard_size = max(1, math.ceil(page_count / (workers * 4)))
+    shards = [range(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+    
+    pool = _get_render_pool(workers)
+    futures = [pool.submit(_render_pages, pdf_path, output_dir, dpi, profiles, shard) for shard in shards]
     
+    images_info = []
+    for future in as_completed(futures):
+        for page_info, stats in future.result():
+            for stat in stats:
+                _observe_render(*stat)
+            images_info.append(page_info)
+            if progress_callback:
+                progress_callback(page_info, page_count)
+    
+    images_info.sort(key=lambda page_info: page_info["page_num"])
     return images_info
 
-def process_pdf_upload(file, session_id):
-    """Processa o upload de um arquivo PDF"""
-    session_dir = os.path.join(UPLOAD_DIR, session_id)
-    os.makedirs(session_dir, exist_ok=True)
+def describe_pdf_pages(pdf_path, dpi=300):
+    """Calcula as dimensões de cada página renderizada a partir de page.rect, sem rasterizar"""
+    session_id = os.path.basename(os.path.dirname(pdf_path))
+    with fitz.open(pdf_path) as doc:
+        return [_page_info(page, session_id, dpi) for page in doc]
+
+def find_session_pdf(session_id):
+    """Retorna o caminho local do PDF original de uma sessão, ou None"""
+    # O session_id vem da URL e é usado para montar caminhos locais
+    if not is_session_id(session_id):
+        return None
+    for filename in sorted(page_store.list_session(session_id)):
+        if filename.lower().endswith(".pdf"):
+            return page_store.local_path(f"{session_id}/{filename}")
+    return None
+
+def get_page_image(session_id, page_num, profile="full", dpi=300):
+    """Retorna o caminho da imagem de uma página, renderizando-a sob demanda se necessário"""
+    image_name = stored_image_name(page_num, profile, dpi)
     
-    # Salva o arquivo PDF
-    pdf_path = os.path.join(session_dir, file.filename)
-    with open(pdf_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Variantes renderizadas no upload ficam no armazenamento de páginas
+    image_path = page_store.local_path(f"{session_id}/{image_name}")
+    if image_path:
+        return image_path
     
-    # Converte PDF para imagens
-    images_info = convert_pdf_to_images(pdf_path, session_dir)
+    pdf_path = find_session_pdf(session_id)
+    if not pdf_path:
+        return None
+    
+    def render(path):
+        with fitz.open(pdf_path) as doc:
+            if not 1 <= page_num <= len(doc):
+                raise IndexError(f"Página {page_num} fora do intervalo")
+            _observe_render(profile, *_render_variant(doc.load_page(page_num - 1), path, profile, dpi))
     
-    # Salva informação da imagem no banco de dados
-    thumbnail_path = f"/images/{session_id}/page_1.png"  # Usa a primeira página como thumbnail
+    try:
+        return render_cache.get_or_create(f"{session_id}/{image_name}", render)
+    except IndexError:
+        return None
+
+def _register_processed_image(session_id, filename, page_count, variants, content_hash=None):
+    """Registra a imagem processada e as variantes pré-renderizadas no banco de dados"""
+    thumbnail_path = f"/thumbnails/{session_id}/1"  # Miniatura da primeira página
     
     # Executa query segura para inserir imagem
     execute_db_query(
-        "INSERT INTO processed_images (id, filename, upload_date, page_count, thumbnail_path) VALUES (?, ?, ?, ?, ?)",
-        (session_id, file.filename, datetime.now().isoformat(), len(images_info), thumbnail_path),
+        "INSERT INTO processed_images (id, filename, upload_date, page_count, thumbnail_path, variants, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (session_id, filename, datetime.now().isoformat(), page_count, thumbnail_path, json.dumps(list(variants)), content_hash),
         commit=True
     )
+    response_cache.invalidate(HISTORY_KEY, image_info_key(session_id))
+
+def find_duplicate_upload(content_hash):
+    """Procura um PDF já processado com o mesmo conteúdo (SHA-256) e retorna suas páginas"""
+    image = execute_db_query(
+        "SELECT id, filename FROM processed_images WHERE content_hash = ? ORDER BY upload_date LIMIT 1",
+        (content_hash,),
+        fetch_one=True
+    )
+    if not image:
+        return None
+    
+    # Só reaproveita se o PDF original ainda estiver armazenado
+    pdf_path = find_session_pdf(image["id"])
+    if not pdf_path:
+        return None
+    
+    images_info = describe_pdf_pages(pdf_path)
+    return {
+        "session_id": image["id"],
+        "filename": image["filename"],
+        "page_count": len(images_info),
+        "pages": images_info
+    }
+
+def register_pdf(session_id, pdf_path, filename, content_hash=None):
+    """Registra um PDF já salvo sem rasterizar; as páginas são renderizadas no primeiro acesso"""
+    images_info = describe_pdf_pages(pdf_path)
+    page_store.publish_session(session_id, os.path.dirname(pdf_path))
+    _register_processed_image(session_id, filename, len(images_info), [], content_hash)
+    
+    return {
+        "session_id": session_id,
+        "filename": filename,
+        "page_count": len(images_info),
+        "pages": images_info
+    }
+
+def process_pdf(session_id, pdf_path, filename, profiles=("full",), content_hash=None, progress_callback=None):
+    """Rasteriza um PDF já salvo nos perfis indicados e registra a imagem no banco de dados"""
+    session_dir = os.path.dirname(pdf_path)
+    
+    # Converte PDF para imagens
+    images_info = convert_pdf_to_images(pdf_path, session_dir, progress_callback=progress_callback, profiles=profiles)
+    
+    # Publica o PDF e as páginas antes de registrar a imagem: a partir do registro, qualquer réplica as encontra
+    page_store.publish_session(session_id, session_dir)
+    _register_processed_image(session_id, filename, len(images_info), profiles, content_hash)
+    
+    # Extrai as palavras para a busca de texto
+    index_session_text(session_id)
     
     return {
         "session_id": session_id,
-        "filename": file.filename,
+        "filename": filename,
         "pages": images_info
-    } 
\ No newline at end of file
+    }
+
+def index_session_text(session_id, progress_callback=None):
+    """Indexa o texto do PDF de uma sessão já publicada no armazenamento"""
+    return index_pdf_text(session_id, find_session_pdf(session_id), progress_callback=progress_callback)
+
+def process_pdf_upload(file, session_id):
+    """Processa o upload de um arquivo PDF"""
+    session_dir = page_store.staging_dir(session_id)
+    os.makedirs(session_dir, exist_ok=True)
+    
+    # Salva o arquivo PDF
+    pdf_path = os.path.join(session_dir, file.filename)
+    with open(pdf_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    
+    return process_pdf(session_id, pdf_path, file.filename)
\ No newline at end of file
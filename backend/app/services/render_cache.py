@@ -0,0 +1,125 @@
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+class RenderCache:
+    """Cache em disco de imagens renderizadas, limitado em bytes, com descarte LRU"""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # chave -> tamanho em bytes, do menos para o mais recente
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # Locks por faixa de chave para que duas requisições não renderizem a mesma imagem
+        self._render_locks = [threading.Lock() for _ in range(64)]
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Reconstrói o índice LRU a partir dos arquivos já em disco (ordem por mtime)"""
+        files = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename.startswith(".tmp-"):
+                    continue
+                stat = os.stat(path)
+                files.append((stat.st_mtime, os.path.relpath(path, self.root), stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """Retorna o caminho da imagem em cache (marcando-a como recente) ou None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            # Persiste a ordem LRU entre reinicializações
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(key, 0)
+            return None
+        return path
+
+    def get_or_create(self, key, render):
+        """Retorna a imagem em cache ou a gera com render(path_temporario)"""
+        path = self.get(key)
+        if path:
+            return path
+
+        with self._render_locks[hash(key) % len(self._render_locks)]:
+            # Outra requisição pode ter gerado a imagem enquanto esperávamos o lock
+            path = self.get(key)
+            if path:
+                return path
+
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = os.path.join(os.path.dirname(path), f".tmp-{uuid.uuid4().hex}-{os.path.basename(path)}")
+            try:
+                render(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            self._add(key, path)
+            return path
+
+    def put(self, key, source_path):
+        """Move para o cache um arquivo já existente (ex.: uma página recém-enviada ao armazenamento)"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(source_path, path)
+        self._add(key, path)
+        return path
+
+    def _add(self, key, path):
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def _evict(self):
+        """Remove as entradas menos usadas até respeitar o limite (chamado com o lock)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, prefix):
+        """Remove do cache (e do disco) as entradas cujas chaves começam com prefix; retorna os bytes liberados"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            freed = 0
+            for key in keys:
+                size = self._entries.pop(key)
+                self._total_bytes -= size
+                freed += size
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+        # Diretórios que ficaram vazios (ex.: os tiles de uma sessão)
+        directory = self._path(prefix.rstrip("/"))
+        if prefix.endswith("/") and os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+        return freed
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "total_bytes": self._total_bytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,102 @@
+"""
+Cache em memória (TTL + LRU) das respostas de leitura mais frequentes.
+
+As escritas invalidam exatamente as chaves afetadas. Cada chave com leitura em andamento tem
+um contador de versão: uma leitura que começou antes de uma invalidação não grava o resultado
+(possivelmente antigo) no cache. O contador é descartado quando a última leitura da chave
+termina, então só existem contadores para as leituras em andamento. O cache é por processo;
+com vários workers, o TTL limita o tempo em que outro processo pode servir uma resposta antiga.
+"""
+import threading
+import time
+from collections import OrderedDict
+from ..core.config import RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES
+
+class ResponseCache:
+    """Cache LRU com expiração por TTL, invalidação por chave e contadores de acertos/falhas"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # {chave: [versão, leituras em andamento]}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1], None
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            version = self._versions.setdefault(key, [0, 0])
+            version[1] += 1
+            return False, None, version[0]
+
+    def _finish_load(self, key, value, version, loaded):
+        with self._lock:
+            current = self._versions[key]
+            current[1] -= 1
+            if current[1] == 0:
+                del self._versions[key]
+            # Uma escrita invalidou a chave durante a leitura: o valor pode estar desatualizado
+            if not loaded or current[0] != version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_load(self, key, loader):
+        """Retorna o valor em cache ou executa loader() (corrotina) e guarda o resultado"""
+        found, value, version = self._lookup(key)
+        if found:
+            return value
+        loaded = False
+        try:
+            value = await loader()
+            loaded = True
+        finally:
+            self._finish_load(key, value, version, loaded)
+        return value
+
+    def invalidate(self, *keys):
+        """Descarta as chaves e impede que leituras em andamento gravem valores antigos"""
+        with self._lock:
+            for key in keys:
+                version = self._versions.get(key)
+                if version:
+                    version[0] += 1
+                self._entries.pop(key, None)
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations
+            }
+
+response_cache = ResponseCache(RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES)
+
+# Chaves das respostas em cache
+HISTORY_KEY = ("history",)
+
+def image_info_key(image_id):
+    return ("image-info", image_id)
+
+def image_coordinates_key(image_id):
+    return ("coordinates", image_id)
@@ -0,0 +1,209 @@
+"""
+Ciclo de vida das sessões de upload ({session_id}/: PDF original + páginas renderizadas) no
+armazenamento de páginas (UPLOAD_DIR ou bucket S3).
+
+A coleta de lixo roda periodicamente em uma thread e pode ser disparada por /admin/storage/gc:
+- sessões sem linha em processed_images (órfãs) são removidas depois de uma carência, para
+  não apagar uploads que ainda estão sendo gravados ou processados;
+- sessões mais antigas que STORAGE_RETENTION_DAYS e, enquanto o total passar de
+  STORAGE_MAX_BYTES, as mais antigas são removidas (arquivos, linha, palavras, coordenadas e
+  entradas dos caches);
+- com STORAGE_KEEP_WITH_COORDINATES, uma sessão com coordenadas salvas nunca é removida: só as
+  páginas pré-renderizadas são apagadas, e voltam a ser geradas sob demanda a partir do PDF, no
+  cache de renderização (limitado em bytes).
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from ..core.config import (
+    STORAGE_GC_INTERVAL_SECONDS, STORAGE_RETENTION_DAYS, STORAGE_MAX_BYTES,
+    STORAGE_KEEP_WITH_COORDINATES, STORAGE_ORPHAN_GRACE_SECONDS
+)
+from ..db.database import execute_db_query, get_db_connection
+from .job_service import active_session_ids
+from .page_store import page_store, render_cache
+from .response_cache import response_cache, HISTORY_KEY, image_info_key, image_coordinates_key
+
+logger = logging.getLogger(__name__)
+
+# Uma coleta por vez (thread periódica e chamadas manuais)
+_gc_lock = threading.Lock()
+
+def _load_images():
+    rows = execute_db_query(
+        """
+        SELECT p.id, p.filename, p.upload_date, p.page_count,
+               (SELECT COUNT(*) FROM saved_coordinates c WHERE c.image_id = p.id) AS coordinates
+        FROM processed_images p
+        ORDER BY p.upload_date
+        """,
+        fetch_all=True
+    )
+    return [dict(row) for row in rows]
+
+def get_storage_report():
+    """Uso de disco por sessão (maiores primeiro), órfãos, sessões sem arquivos e limites configurados"""
+    usage = page_store.usage()
+    images = _load_images()
+    sessions = []
+    for image in images:
+        files = usage.get(image["id"])
+        sessions.append({
+            "session_id": image["id"],
+            "filename": image["filename"],
+            "upload_date": image["upload_date"],
+            "page_count": image["page_count"],
+            "coordinates": image["coordinates"],
+            "bytes": files["bytes"] if files else 0,
+            "pdf_bytes": files["pdf_bytes"] if files else 0,
+            "files": files["files"] if files else 0,
+            "missing_files": files is None
+        })
+    registered = {image["id"] for image in images}
+    orphans = [
+        {
+            "session_id": session_id,
+            "bytes": files["bytes"],
+            "files": files["files"],
+            "modified_at": datetime.fromtimestamp(files["modified_at"]).isoformat()
+        }
+        for session_id, files in usage.items() if session_id not in registered
+    ]
+    sessions.sort(key=lambda session: session["bytes"], reverse=True)
+    orphans.sort(key=lambda orphan: orphan["bytes"], reverse=True)
+    return {
+        "storage": page_store.describe(),
+        "total_bytes": sum(files["bytes"] for files in usage.values()),
+        "session_count": len(sessions),
+        "orphan_count": len(orphans),
+        "limits": {
+            "retention_days": STORAGE_RETENTION_DAYS or None,
+            "max_bytes": STORAGE_MAX_BYTES or None,
+            "keep_with_coordinates": STORAGE_KEEP_WITH_COORDINATES,
+            "orphan_grace_seconds": STORAGE_ORPHAN_GRACE_SECONDS,
+            "gc_interval_seconds": STORAGE_GC_INTERVAL_SECONDS or None
+        },
+        "render_cache": render_cache.stats(),
+        "sessions": sessions,
+        "orphans": orphans
+    }
+
+def _delete_session(session_id):
+    """Remove a sessão do banco (com palavras e coordenadas), do disco e dos caches"""
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM saved_coordinates WHERE image_id = ?", (session_id,))
+        # Chaves das páginas no índice espacial (o trigger do R*Tree só remove os pontos)
+        conn.execute("DELETE FROM coordinate_pages WHERE image_id = ?", (session_id,))
+        conn.execute("DELETE FROM page_words WHERE image_id = ?", (session_id,))
+        conn.execute("DELETE FROM processed_images WHERE id = ?", (session_id,))
+        conn.commit()
+    response_cache.invalidate(HISTORY_KEY, image_info_key(session_id), image_coordinates_key(session_id))
+    page_store.delete_session(session_id)
+    render_cache.invalidate(f"{session_id}/")
+
+def _compact_session(session_id):
+    """Apaga as páginas pré-renderizadas e mantém o PDF; as páginas passam a ser renderizadas sob demanda"""
+    for filename in page_store.list_session(session_id):
+        if not filename.lower().endswith(".pdf"):
+            page_store.delete(f"{session_id}/{filename}")
+    execute_db_query("UPDATE processed_images SET variants = '[]' WHERE id = ?", (session_id,), commit=True)
+    response_cache.invalidate(HISTORY_KEY, image_info_key(session_id))
+
+def _remove_orphan(session_id):
+    page_store.delete_session(session_id)
+    render_cache.invalidate(f"{session_id}/")
+
+def collect_garbage(dry_run=False):
+    """
+    Aplica a retenção (órfãos, idade e total de bytes) e retorna as ações tomadas; com
+    dry_run, só calcula o que seria removido
+    """
+    with _gc_lock:
+        usage = page_store.usage()
+        images = _load_images()
+        busy = active_session_ids()
+        total_before = sum(files["bytes"] for files in usage.values())
+        total = total_before
+        actions = {"orphans_removed": [], "deleted": [], "compacted": [], "staging_removed": []}
+        if not dry_run:
+            # Com o S3, uploads interrompidos antes da publicação deixam só a área local
+            actions["staging_removed"] = page_store.remove_stale_staging(STORAGE_ORPHAN_GRACE_SECONDS, busy)
+
+        def apply(kind, session_id, freed, func):
+            nonlocal total
+            if not dry_run:
+                func(session_id)
+            total -= freed
+            actions[kind].append({"session_id": session_id, "freed_bytes": freed})
+
+        # Sessões sem registro no banco, fora da carência e sem job em andamento
+        registered = {image["id"] for image in images}
+        now = time.time()
+        for session_id, files in usage.items():
+            if session_id in registered or session_id in busy:
+                continue
+            if now - files["modified_at"] < STORAGE_ORPHAN_GRACE_SECONDS:
+                continue
+            apply("orphans_removed", session_id, files["bytes"], _remove_orphan)
+
+        def expire(image):
+            session_id = image["id"]
+            files = usage.get(session_id, {"bytes": 0, "pdf_bytes": 0})
+            if image["coordinates"] and STORAGE_KEEP_WITH_COORDINATES:
+                freed = files["bytes"] - files["pdf_bytes"]
+                if freed > 0:
+                    apply("compacted", session_id, freed, _compact_session)
+            else:
+                apply("deleted", session_id, files["bytes"], _delete_session)
+
+        # Sessões mais antigas que a retenção e depois, das mais antigas para as mais novas,
+        # enquanto o total passar do limite
+        remaining = [image for image in images if image["id"] not in busy]
+        if STORAGE_RETENTION_DAYS:
+            cutoff = (datetime.now() - timedelta(days=STORAGE_RETENTION_DAYS)).isoformat()
+            expired = [image for image in remaining if image["upload_date"] < cutoff]
+            remaining = [image for image in remaining if image["upload_date"] >= cutoff]
+            for image in expired:
+                expire(image)
+        if STORAGE_MAX_BYTES:
+            for image in remaining:
+                if total <= STORAGE_MAX_BYTES:
+                    break
+                expire(image)
+
+        result = {
+            "dry_run": dry_run,
+            "total_bytes_before": total_before,
+            "total_bytes_after": total,
+            "freed_bytes": total_before - total,
+            **actions
+        }
+
+    if not dry_run and result["freed_bytes"]:
+        logger.info(
+            "Coleta de lixo do armazenamento: %d bytes liberados (%d sessões removidas, %d compactadas, %d órfãos)",
+            result["freed_bytes"], len(actions["deleted"]), len(actions["compacted"]), len(actions["orphans_removed"]),
+            extra={key: value for key, value in result.items() if key not in actions}
+        )
+    return result
+
+_gc_thread = None
+_gc_stop = threading.Event()
+
+def _gc_loop():
+    while True:
+        try:
+            collect_garbage()
+        except Exception:
+            logger.exception("Erro na coleta de lixo do armazenamento")
+        if _gc_stop.wait(STORAGE_GC_INTERVAL_SECONDS):
+            return
+
+def start_storage_gc():
+    """Inicia a thread de coleta de lixo periódica (se STORAGE_GC_INTERVAL_SECONDS > 0)"""
+    global _gc_thread
+    if STORAGE_GC_INTERVAL_SECONDS <= 0 or _gc_thread is not None:
+        return
+    _gc_thread = threading.Thread(target=_gc_loop, name="storage-gc", daemon=True)
+    _gc_thread.start()
@@ -0,0 +1,110 @@
+import fitz  # PyMuPDF
+import logging
+from ..db.database import get_db_connection, execute_db_query_async
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de palavras inseridas por executemany
+_INSERT_BATCH_SIZE = 5000
+
+def _extract_page_words(page, image_id):
+    """Palavras de uma página com a caixa delimitadora e o centro em coordenadas do visualizador"""
+    rect = page.rect
+    rows = []
+    for x0, y0, x1, y1, word, *_ in page.get_text("words"):
+        # O visualizador normaliza x e y pela largura da imagem
+        x = ((x0 + x1) / 2 - rect.x0) / rect.width
+        y = ((y0 + y1) / 2 - rect.y0) / rect.width
+        rows.append((image_id, page.number + 1, word, x, y, x0, y0, x1, y1))
+    return rows
+
+INSERT_WORDS_QUERY = "INSERT INTO page_words (image_id, page, word, x, y, x0, y0, x1, y1) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+def _write_words(image_id, batch, replace):
+    """Grava um lote de palavras numa transação curta; replace apaga antes as palavras anteriores da imagem"""
+    with get_db_connection() as conn:
+        if replace:
+            conn.execute("DELETE FROM page_words WHERE image_id = ?", (image_id,))
+        conn.executemany(INSERT_WORDS_QUERY, batch)
+        conn.commit()
+
+def index_pdf_text(image_id, pdf_path, progress_callback=None):
+    """
+    Extrai as palavras de todas as páginas do PDF e as grava em page_words. A extração roda
+    fora de transação; cada lote é gravado numa transação curta, para não segurar o lock de
+    escrita do SQLite (e bloquear as gravações de coordenadas) durante PDFs grandes
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+        batch = []
+        total_words = 0
+        # Reindexar substitui as palavras anteriores da imagem (junto com o primeiro lote)
+        replace = True
+        for page in doc:
+            words = _extract_page_words(page, image_id)
+            batch.extend(words)
+            total_words += len(words)
+            if len(batch) >= _INSERT_BATCH_SIZE:
+                _write_words(image_id, batch, replace)
+                batch = []
+                replace = False
+            
+            if progress_callback:
+                progress_callback({"page_num": page.number + 1, "words": len(words)}, page_count)
+        
+        if batch or replace:
+            _write_words(image_id, batch, replace)
+    
+    logger.info(
+        "Texto indexado para imagem %s: %d palavras em %d páginas", image_id, total_words, page_count,
+        extra={"image_id": image_id, "words": total_words, "pages": page_count}
+    )
+    return total_words
+
+async def search_text(q, image_id=None, page=None, prefix=True, limit=50):
+    """Busca palavras extraídas dos PDFs (exata ou por prefixo, sem diferenciar maiúsculas)"""
+    term = q.strip()
+    if not term:
+        raise ValueError("Informe o texto buscado")
+    
+    if prefix:
+        # Escapa curingas para que o prefixo use o índice de page_words.word
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions = ["pw.word LIKE ? ESCAPE '\\'"]
+        params = [f"{escaped}%"]
+    else:
+        conditions = ["pw.word = ?"]
+        params = [term]
+    if image_id:
+        conditions.append("pw.image_id = ?")
+        params.append(image_id)
+    if page is not None:
+        conditions.append("pw.page = ?")
+        params.append(page)
+    
+    rows = await execute_db_query_async(
+        f"""
+        SELECT pw.*, pi.filename
+        FROM page_words pw
+        JOIN processed_images pi ON pi.id = pw.image_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY pw.word
+        LIMIT ?
+        """,
+        (*params, limit),
+        fetch_all=True
+    )
+    
+    result = []
+    for row in rows:
+        result.append({
+            "image_id": row["image_id"],
+            "filename": row["filename"],
+            "page": row["page"],
+            "word": row["word"],
+            "x": row["x"],
+            "y": row["y"],
+            "bbox": [row["x0"], row["y0"], row["x1"], row["y1"]]
+        })
+    
+    return result
@@ -0,0 +1,77 @@
+import fitz  # PyMuPDF
+import math
+import os
+from functools import lru_cache
+from ..core.config import TILE_SIZE
+from ..core.metrics import PAGE_RENDER_DURATION, PAGE_RENDER_BYTES
+from .pdf_service import find_session_pdf, render_cache
+
+@lru_cache(maxsize=1024)
+def _page_geometry(pdf_path, page_num, dpi):
+    """Retângulo da página (em pontos) e dimensões da página renderizada no DPI completo"""
+    with fitz.open(pdf_path) as doc:
+        if not 1 <= page_num <= len(doc):
+            return None
+        rect = doc.load_page(page_num - 1).rect
+    size = (rect * fitz.Matrix(dpi/72, dpi/72)).irect
+    return tuple(rect), size.width, size.height
+
+def _max_level(width, height):
+    """Nível de resolução completa, seguindo a convenção Deep Zoom (nível 0 = 1x1 pixel)"""
+    return math.ceil(math.log2(max(width, height, 1)))
+
+def get_tile_info(session_id, page_num, dpi=300):
+    """Descreve a pirâmide de tiles de uma página, ou None se a página não existir"""
+    pdf_path = find_session_pdf(session_id)
+    if not pdf_path:
+        return None
+    geometry = _page_geometry(pdf_path, page_num, dpi)
+    if not geometry:
+        return None
+    _, width, height = geometry
+    return {
+        "width": width,
+        "height": height,
+        "tileSize": TILE_SIZE,
+        "tileOverlap": 0,
+        "minLevel": 0,
+        "maxLevel": _max_level(width, height),
+        "format": "png",
+        "tiles": f"/tiles/{session_id}/{page_num}"
+    }
+
+def get_tile(session_id, page_num, level, x, y, dpi=300):
+    """Retorna o caminho de um tile, renderizando só a região dele a partir do PDF no primeiro acesso"""
+    pdf_path = find_session_pdf(session_id)
+    if not pdf_path:
+        return None
+    geometry = _page_geometry(pdf_path, page_num, dpi)
+    if not geometry:
+        return None
+    page_rect, width, height = geometry
+    
+    max_level = _max_level(width, height)
+    if not 0 <= level <= max_level:
+        return None
+    
+    # Dimensões da página neste nível: cada nível abaixo do máximo tem metade da resolução
+    level_scale = 2 ** (level - max_level)
+    level_width = math.ceil(width * level_scale)
+    level_height = math.ceil(height * level_scale)
+    if not (0 <= x < math.ceil(level_width / TILE_SIZE) and 0 <= y < math.ceil(level_height / TILE_SIZE)):
+        return None
+    
+    # Região do tile em pixels do nível, convertida para pontos do PDF
+    zoom = dpi / 72 * level_scale
+    x0, y0 = x * TILE_SIZE, y * TILE_SIZE
+    x1, y1 = min(x0 + TILE_SIZE, level_width), min(y0 + TILE_SIZE, level_height)
+    clip = fitz.Rect(x0 / zoom, y0 / zoom, x1 / zoom, y1 / zoom) + (page_rect[0], page_rect[1], page_rect[0], page_rect[1])
+    
+    def render(path):
+        with PAGE_RENDER_DURATION.time("tile"), fitz.open(pdf_path) as doc:
+            pix = doc.load_page(page_num - 1).get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+            pix.save(path, output="png")
+        PAGE_RENDER_BYTES.inc("tile", amount=os.path.getsize(path))
+    
+    # O tamanho do tile faz parte da chave: o cache em disco sobrevive a uma mudança de TILE_SIZE
+    return render_cache.get_or_create(f"{session_id}/tiles/{TILE_SIZE}/{page_num}/{level}/{x}_{y}.png", render)
@@ -0,0 +1,101 @@
+"""
+Benchmark de gravação de coordenadas com clientes concorrentes: conexão nova por
+query em modo rollback-journal (caminho antigo) vs pool de conexões com WAL.
+
+Uso (a partir do diretório backend):
+    python -m benchmarks.bench_db --clients 1 4 16 --saves 500
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# O banco do benchmark precisa ser definido antes de importar o módulo de banco de dados
+_workdir = tempfile.mkdtemp(prefix="bench_db_")
+os.environ["DB_FILE"] = os.path.join(_workdir, "pooled.db")
+
+from app.db.database import execute_db_query, init_db  # noqa: E402
+from app.services.coordinate_service import INSERT_COORDINATE_QUERY  # noqa: E402
+
+IMAGE_ID = "bench-image"
+LEGACY_DB_FILE = os.path.join(_workdir, "legacy.db")
+
+def setup():
+    """Cria os dois bancos com o mesmo schema e uma imagem de referência"""
+    init_db()
+    schema = execute_db_query(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name IN ('processed_images', 'saved_coordinates')",
+        fetch_all=True
+    )
+    legacy = sqlite3.connect(LEGACY_DB_FILE)
+    for row in schema:
+        legacy.execute(row["sql"])
+    legacy.commit()
+    legacy.close()
+
+    image = (IMAGE_ID, "bench.pdf", datetime.now().isoformat(), 1, None)
+    execute_db_query("INSERT INTO processed_images (id, filename, upload_date, page_count, thumbnail_path) VALUES (?, ?, ?, ?, ?)", image, commit=True)
+    legacy = sqlite3.connect(LEGACY_DB_FILE)
+    legacy.execute("INSERT INTO processed_images (id, filename, upload_date, page_count, thumbnail_path) VALUES (?, ?, ?, ?, ?)", image)
+    legacy.commit()
+    legacy.close()
+
+def save_legacy(i):
+    """Reproduz o caminho antigo: duas conexões novas (SELECT e INSERT), commit em rollback-journal"""
+    conn = sqlite3.connect(LEGACY_DB_FILE, check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    image = conn.execute("SELECT id, filename FROM processed_images WHERE id = ?", (IMAGE_ID,)).fetchone()
+    conn.close()
+
+    conn = sqlite3.connect(LEGACY_DB_FILE, check_same_thread=False, timeout=30)
+    conn.execute(
+        "INSERT INTO saved_coordinates (image_id, name, x, y, page, created_at, source) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (IMAGE_ID, f"P-{i}", 0.5, 0.5, 1, datetime.now().isoformat(), image["filename"])
+    )
+    conn.commit()
+    conn.close()
+
+def save_pooled(i):
+    """Caminho atual: um único INSERT ... SELECT em uma conexão do pool"""
+    execute_db_query(
+        INSERT_COORDINATE_QUERY,
+        (f"P-{i}", 0.5, 0.5, 1, datetime.now().isoformat(), None, IMAGE_ID),
+        fetch_one=True,
+        commit=True
+    )
+
+def run(save, clients, saves_per_client):
+    def client(offset):
+        for i in range(saves_per_client):
+            save(offset + i)
+
+    threads = [threading.Thread(target=client, args=(n * saves_per_client,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return clients * saves_per_client / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--saves", type=int, default=500, help="gravações por cliente")
+    args = parser.parse_args()
+
+    try:
+        setup()
+        print(f"{'clientes':>8} {'antigo (gravações/s)':>21} {'pool+WAL (gravações/s)':>23} {'speedup':>8}")
+        for clients in args.clients:
+            legacy = run(save_legacy, clients, args.saves)
+            pooled = run(save_pooled, clients, args.saves)
+            print(f"{clients:>8} {legacy:>21.0f} {pooled:>23.0f} {pooled / legacy:>7.2f}x")
+    finally:
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
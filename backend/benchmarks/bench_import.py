@@ -0,0 +1,84 @@
+"""
+Benchmark de importação de coordenadas: um INSERT com commit por coordenada (caminho
+de POST /coordinates/{image_id}) vs importação em lote com executemany em uma única
+transação (caminho de POST /coordinates/{image_id}/batch).
+
+Uso (a partir do diretório backend):
+    python -m benchmarks.bench_import --rows 1000 10000 50000
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+# O banco do benchmark precisa ser definido antes de importar o módulo de banco de dados
+_workdir = tempfile.mkdtemp(prefix="bench_import_")
+os.environ["DB_FILE"] = os.path.join(_workdir, "import.db")
+
+from app.db.database import execute_db_query, init_db  # noqa: E402
+from app.services.coordinate_service import INSERT_COORDINATE_QUERY, import_coordinates  # noqa: E402
+
+IMAGE_ID = "bench-image"
+
+def setup():
+    init_db()
+    execute_db_query(
+        "INSERT INTO processed_images (id, filename, upload_date, page_count, thumbnail_path) VALUES (?, ?, ?, ?, ?)",
+        (IMAGE_ID, "bench.pdf", datetime.now().isoformat(), 10, None),
+        commit=True
+    )
+
+def make_records(rows):
+    """Registros no formato aceito por /batch, como viriam de uma planilha de levantamento"""
+    rng = random.Random(rows)
+    return [
+        {"name": f"P-{i}", "x": rng.random(), "y": rng.random() * 1.4, "page": rng.randint(1, 10)}
+        for i in range(rows)
+    ]
+
+def clear():
+    """Esvazia a tabela e compacta o banco, para que cada medição parta do mesmo estado"""
+    execute_db_query("DELETE FROM saved_coordinates", commit=True)
+    execute_db_query("INSERT INTO saved_coordinates_fts (saved_coordinates_fts) VALUES ('rebuild')", commit=True)
+    execute_db_query("VACUUM")
+
+def run_single(records):
+    start = time.perf_counter()
+    for record in records:
+        execute_db_query(
+            INSERT_COORDINATE_QUERY,
+            (record["name"], record["x"], record["y"], record["page"], datetime.now().isoformat(), None, IMAGE_ID),
+            fetch_one=True,
+            commit=True
+        )
+    return len(records) / (time.perf_counter() - start)
+
+def run_batch(records):
+    start = time.perf_counter()
+    for _ in import_coordinates(IMAGE_ID, "bench.pdf", records):
+        pass
+    return len(records) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    try:
+        setup()
+        print(f"{'linhas':>8} {'um a um (linhas/s)':>19} {'lote (linhas/s)':>16} {'speedup':>8}")
+        for rows in args.rows:
+            records = make_records(rows)
+            clear()
+            single = run_single(records)
+            clear()
+            batch = run_batch(records)
+            print(f"{rows:>8} {single:>19.0f} {batch:>16.0f} {batch / single:>7.2f}x")
+    finally:
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
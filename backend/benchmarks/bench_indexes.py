@@ -0,0 +1,112 @@
+"""
+Benchmark das consultas de coordenadas antes e depois dos índices da migração 5.
+
+Gera um banco sintético (padrão: 1M coordenadas em 1.000 imagens), mede as consultas
+de listagem/exportação no schema sem índices e repete após aplicar a migração.
+
+Uso (a partir do diretório backend):
+    python -m benchmarks.bench_indexes --rows 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from app.db.migrations import migrate
+
+INDEX_MIGRATION = 5
+
+QUERIES = {
+    "get_coordinates (uma imagem)": (
+        "SELECT * FROM saved_coordinates WHERE image_id = ? ORDER BY created_at DESC",
+        lambda images: (random.choice(images),)
+    ),
+    "export_coordinates_csv (uma imagem)": (
+        "SELECT * FROM saved_coordinates WHERE image_id = ? ORDER BY created_at",
+        lambda images: (random.choice(images),)
+    ),
+    "/all-coordinates (primeiras 100)": (
+        """
+        SELECT sc.*, pi.filename
+        FROM saved_coordinates sc
+        JOIN processed_images pi ON sc.image_id = pi.id
+        ORDER BY sc.created_at DESC
+        LIMIT 100
+        """,
+        lambda images: ()
+    ),
+    "nome exato": (
+        "SELECT * FROM saved_coordinates WHERE name = ? COLLATE NOCASE",
+        lambda images: (f"p-{random.randrange(100000)}",)
+    ),
+    "página de uma imagem": (
+        "SELECT * FROM saved_coordinates WHERE image_id = ? AND page = ?",
+        lambda images: (random.choice(images), 1)
+    ),
+}
+
+def populate(conn, rows, images):
+    """Insere imagens e coordenadas sintéticas com datas embaralhadas"""
+    start = datetime(2024, 1, 1)
+    image_ids = [f"image-{n:05d}" for n in range(images)]
+    conn.executemany(
+        "INSERT INTO processed_images (id, filename, upload_date, page_count, thumbnail_path) VALUES (?, ?, ?, ?, ?)",
+        [(image_id, f"{image_id}.pdf", start.isoformat(), 10, None) for image_id in image_ids]
+    )
+
+    def generate():
+        for n in range(rows):
+            created_at = start + timedelta(seconds=random.randrange(365 * 24 * 3600))
+            yield (random.choice(image_ids), f"P-{n % 100000}", random.random(), random.random(),
+                   random.randint(1, 10), created_at.isoformat(), None)
+
+    conn.executemany(
+        "INSERT INTO saved_coordinates (image_id, name, x, y, page, created_at, source) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        generate()
+    )
+    conn.commit()
+    return image_ids
+
+def measure(conn, image_ids, repeat):
+    """Tempo médio (ms) de cada consulta"""
+    results = {}
+    for label, (query, params) in QUERIES.items():
+        random.seed(label)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(query, params(image_ids)).fetchall()
+        results[label] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--images", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_indexes_")
+    try:
+        conn = sqlite3.connect(os.path.join(workdir, "bench.db"))
+        migrate(conn, target_version=INDEX_MIGRATION - 1)
+        image_ids = populate(conn, args.rows, args.images)
+
+        before = measure(conn, image_ids, args.repeat)
+        start = time.perf_counter()
+        migrate(conn, target_version=INDEX_MIGRATION)
+        print(f"Migração {INDEX_MIGRATION} aplicada em {time.perf_counter() - start:.1f}s")
+        conn.execute("ANALYZE")
+        after = measure(conn, image_ids, args.repeat)
+        conn.close()
+
+        print(f"{'consulta':<40} {'antes (ms)':>11} {'depois (ms)':>12} {'speedup':>8}")
+        for label in QUERIES:
+            print(f"{label:<40} {before[label]:>11.2f} {after[label]:>12.2f} {before[label] / after[label]:>7.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
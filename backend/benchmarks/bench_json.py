@@ -0,0 +1,102 @@
+"""
+Benchmark da serialização de listagens de coordenadas: caminho antigo (sqlite3.Row ->
+dict por linha -> jsonable_encoder -> json) vs tuplas do cursor serializadas com orjson,
+em lista de objetos e no formato compact (colunas + linhas em arrays).
+
+Uso (a partir do diretório backend):
+    python -m benchmarks.bench_json --rows 10000 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+# O banco do benchmark precisa ser definido antes de importar o módulo de banco de dados
+_workdir = tempfile.mkdtemp(prefix="bench_json_")
+os.environ["DB_FILE"] = os.path.join(_workdir, "json.db")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from app.core.json_response import rows_response  # noqa: E402
+from app.db.database import execute_db_query, execute_db_query_tuples, get_db_connection, init_db  # noqa: E402
+from app.services.coordinate_service import IMPORT_COORDINATE_QUERY, IMAGE_COORDINATES_QUERY  # noqa: E402
+
+IMAGE_ID = "bench-image"
+
+def setup():
+    init_db()
+    execute_db_query(
+        "INSERT INTO processed_images (id, filename, upload_date, page_count, thumbnail_path) VALUES (?, ?, ?, ?, ?)",
+        (IMAGE_ID, "bench.pdf", datetime.now().isoformat(), 10, None),
+        commit=True
+    )
+
+def add_rows(start, end):
+    rng = random.Random(end)
+    now = datetime.now().isoformat()
+    with get_db_connection() as conn:
+        conn.executemany(IMPORT_COORDINATE_QUERY, [
+            (IMAGE_ID, f"P-{i}", rng.random(), rng.random(), rng.randint(1, 10), now, "levantamento")
+            for i in range(start, end)
+        ])
+        conn.commit()
+
+def legacy():
+    """Reproduz o handler antigo de /coordinates/{image_id}"""
+    rows = execute_db_query(
+        "SELECT * FROM saved_coordinates WHERE image_id = ? ORDER BY created_at DESC",
+        (IMAGE_ID,),
+        fetch_all=True
+    )
+    result = []
+    for row in rows:
+        result.append({
+            "id": row["id"],
+            "image_id": row["image_id"],
+            "name": row["name"],
+            "x": row["x"],
+            "y": row["y"],
+            "page": row["page"],
+            "created_at": row["created_at"],
+            "source": row["source"] if row["source"] else ""
+        })
+    return JSONResponse(jsonable_encoder(result)).body
+
+def fast(row_format):
+    columns, rows = execute_db_query_tuples(IMAGE_COORDINATES_QUERY, (IMAGE_ID,))
+    return rows_response(columns, rows, row_format).body
+
+def measure(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    try:
+        setup()
+        total = 0
+        print(f"{'linhas':>8} {'caminho':>10} {'tempo (ms)':>11} {'tamanho (KB)':>13} {'speedup':>8}")
+        for rows in sorted(args.rows):
+            add_rows(total, rows)
+            total = rows
+            base, size = measure(legacy)
+            print(f"{total:>8} {'antigo':>10} {base * 1000:>11.1f} {size / 1024:>13.0f} {'1.00x':>8}")
+            for row_format in ("objects", "compact"):
+                elapsed, size = measure(fast, row_format)
+                print(f"{total:>8} {row_format:>10} {elapsed * 1000:>11.1f} {size / 1024:>13.0f} {base / elapsed:>7.2f}x")
+    finally:
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
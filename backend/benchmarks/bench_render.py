@@ -0,0 +1,65 @@
+"""
+Benchmark de renderização de PDF: caminho serial vs pool de processos.
+
+Uso (a partir do diretório backend):
+    python -m benchmarks.bench_render --pages 64 --workers 1 4 8 16
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import fitz  # PyMuPDF
+from app.services.pdf_service import convert_pdf_to_images
+
+def make_synthetic_pdf(path, pages, width=1684, height=1191):
+    """Gera um PDF com conteúdo vetorial denso (tamanho A2 paisagem por padrão)"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=width, height=height)
+        for i in range(0, int(width), 20):
+            page.draw_line((i, 0), (width - i, height), color=(0, 0, 0.6), width=0.5)
+        for i in range(0, int(height), 40):
+            page.insert_text((20, i + 20), f"TAG-{page_num + 1}-{i:04d} VALVULA V-{i % 97:03d}", fontsize=8)
+    doc.save(path)
+    doc.close()
+
+def run(pdf_path, workers, dpi):
+    output_dir = tempfile.mkdtemp(prefix="bench_render_")
+    try:
+        start = time.perf_counter()
+        images_info = convert_pdf_to_images(pdf_path, output_dir, dpi=dpi, workers=workers)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return len(images_info), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=32)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_pdf_")
+    try:
+        pdf_path = os.path.join(workdir, "synthetic.pdf")
+        make_synthetic_pdf(pdf_path, args.pages)
+
+        # Aquece o pool de processos para não medir o custo de criação
+        for workers in args.workers:
+            if workers > 1:
+                run(pdf_path, workers, 36)
+
+        baseline = None
+        print(f"{'workers':>8} {'páginas':>8} {'tempo (s)':>10} {'páginas/s':>10} {'speedup':>8}")
+        for workers in args.workers:
+            pages, elapsed = run(pdf_path, workers, args.dpi)
+            rate = pages / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>8} {pages:>8} {elapsed:>10.2f} {rate:>10.2f} {rate / baseline:>7.2f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
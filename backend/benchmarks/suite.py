@@ -0,0 +1,334 @@
+"""
+Suíte de benchmarks reproduzível: ingestão, servidor de imagens e consultas de coordenadas.
+
+Gera PDFs sintéticos (vários números de páginas e tamanhos) e tabelas sintéticas de
+saved_coordinates, mede a aplicação por um cliente ASGI em processo (httpx, sem rede) e
+grava os resultados em JSON para comparação entre versões.
+
+Uso (a partir do diretório backend):
+    python -m benchmarks.suite --preset quick --output benchmark-results.json
+    python -m benchmarks.suite --rows 10000 1000000 10000000 --pages 16 64 --sizes a4 a0
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+# Banco, uploads e cache do benchmark precisam ser definidos antes de importar a aplicação
+_workdir = tempfile.mkdtemp(prefix="bench_suite_")
+os.environ["DB_FILE"] = os.path.join(_workdir, "suite.db")
+os.environ["UPLOAD_DIR"] = os.path.join(_workdir, "uploads")
+os.environ["RENDER_CACHE_DIR"] = os.path.join(_workdir, "render-cache")
+
+import fitz  # noqa: E402  PyMuPDF
+import httpx  # noqa: E402
+from app.core.config import RENDER_WORKERS  # noqa: E402
+from app.db.database import get_db_connection  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.pdf_service import convert_pdf_to_images  # noqa: E402
+from benchmarks.bench_render import make_synthetic_pdf  # noqa: E402
+
+# Tamanhos de página em pontos (paisagem)
+PAGE_SIZES = {
+    "a4": (842, 595),
+    "a2": (1684, 1191),
+    "a0": (3370, 2384),
+}
+
+PRESETS = {
+    "quick": {"pages": [4, 16], "sizes": ["a4", "a2"], "rows": [10000, 100000]},
+    "full": {"pages": [16, 64], "sizes": ["a4", "a2", "a0"], "rows": [10000, 100000, 1000000, 10000000]},
+}
+
+SYNTHETIC_IMAGES = 10
+
+def latency_stats(samples):
+    """Resumo das latências (em ms) de uma série de medições em segundos"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def make_pdf(pages, size):
+    """PDF sintético único (o conteúdo leva um id aleatório para não ser deduplicado no upload)"""
+    path = os.path.join(_workdir, f"synthetic_{size}_{pages}_{uuid.uuid4().hex[:8]}.pdf")
+    width, height = PAGE_SIZES[size]
+    make_synthetic_pdf(path, pages, width, height)
+    with fitz.open(path) as doc:
+        doc[0].insert_text((20, height - 20), uuid.uuid4().hex, fontsize=6)
+        doc.saveIncr()
+    return path
+
+def bench_render(pdf_path, pages, size):
+    output_dir = tempfile.mkdtemp(prefix="render_", dir=_workdir)
+    try:
+        start = time.perf_counter()
+        convert_pdf_to_images(pdf_path, output_dir)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return {
+        "benchmark": "convert_pdf_to_images",
+        "params": {"pages": pages, "size": size, "workers": RENDER_WORKERS},
+        "metrics": {"seconds": elapsed, "pages_per_second": pages / elapsed}
+    }
+
+async def bench_upload(client, pdf_path, pages, size):
+    """Latência do upload até o job de renderização terminar"""
+    start = time.perf_counter()
+    with open(pdf_path, "rb") as file:
+        response = await client.post("/upload-pdf/", files={"file": (os.path.basename(pdf_path), file, "application/pdf")})
+    response.raise_for_status()
+    accepted = time.perf_counter() - start
+    upload = response.json()
+
+    job = upload
+    while job.get("status") not in ("completed", "failed"):
+        await asyncio.sleep(0.05)
+        job = (await client.get(f"/jobs/{upload['job_id']}")).json()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "benchmark": "upload_end_to_end",
+        "params": {"pages": pages, "size": size},
+        "metrics": {"accepted_ms": accepted * 1000, "completed_seconds": elapsed, "status": job["status"]}
+    }
+    return upload["session_id"], result
+
+async def bench_images(client, session_id, requests, concurrency):
+    """Vazão de /images para uma página já renderizada, com e sem revalidação (304)"""
+    url = f"/images/{session_id}/page_1.png"
+    first = await client.get(url)
+    first.raise_for_status()
+    etag = first.headers.get("etag")
+
+    results = []
+    for mode, headers in (("full", {}), ("not_modified", {"If-None-Match": etag} if etag else None)):
+        if headers is None:
+            continue
+        samples = []
+
+        async def worker(count):
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                await response.aread()
+                samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        results.append({
+            "benchmark": "images_throughput",
+            "params": {"mode": mode, "requests": len(samples), "concurrency": concurrency, "bytes": len(first.content)},
+            "metrics": {"requests_per_second": len(samples) / elapsed, "latency": latency_stats(samples)}
+        })
+    return results
+
+def load_coordinates(start, end):
+    """
+    Insere as coordenadas [start, end) em SQL (CTE recursiva), sem passar pelo Python linha a
+    linha. Os triggers dos índices FTS5 e R*Tree são suspensos e os índices reconstruídos no fim
+    """
+    with get_db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR IGNORE INTO processed_images (id, filename, upload_date, page_count, thumbnail_path) VALUES (?, ?, ?, ?, ?)",
+            [(f"bench-{i}", f"bench-{i}.pdf", datetime.now().isoformat(), 10, None) for i in range(SYNTHETIC_IMAGES)]
+        )
+        if end <= start:
+            conn.commit()
+            return
+
+        triggers = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'saved_coordinates'"
+        ).fetchall()
+        for trigger in triggers:
+            conn.execute(f"DROP TRIGGER {trigger['name']}")
+
+        conn.execute(
+            """
+            WITH RECURSIVE seq(i) AS (SELECT ? UNION ALL SELECT i + 1 FROM seq WHERE i + 1 < ?)
+            INSERT INTO saved_coordinates (image_id, name, x, y, page, created_at, source)
+            SELECT 'bench-' || (i % ?), 'P-' || i,
+                   abs(random() % 1000000) / 1e6, abs(random() % 1400000) / 1e6,
+                   1 + i % 10, printf('2024-01-01T%012d', i),
+                   CASE WHEN i % 3 = 0 THEN NULL ELSE 'levantamento' END
+            FROM seq
+            """,
+            (start, end, SYNTHETIC_IMAGES)
+        )
+
+        for trigger in triggers:
+            conn.execute(trigger["sql"])
+        conn.execute("INSERT INTO saved_coordinates_fts (saved_coordinates_fts) VALUES ('rebuild')")
+        conn.execute("INSERT OR IGNORE INTO coordinate_pages (image_id, page) SELECT DISTINCT image_id, page FROM saved_coordinates")
+        conn.execute("DELETE FROM saved_coordinates_rtree")
+        conn.execute(
+            """
+            INSERT INTO saved_coordinates_rtree
+            SELECT sc.id, cp.key, cp.key, sc.x, sc.x, sc.y, sc.y
+            FROM saved_coordinates sc
+            JOIN coordinate_pages cp ON cp.image_id = sc.image_id AND cp.page = sc.page
+            """
+        )
+        conn.commit()
+
+async def timed_get(client, url, params=None):
+    start = time.perf_counter()
+    size = 0
+    async with client.stream("GET", url, params=params) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+    return time.perf_counter() - start, size
+
+async def bench_coordinate_queries(client, rows, max_response_rows, repeat):
+    """Latência de /all-coordinates e das exportações para uma tabela de rows coordenadas"""
+    targets = [
+        ("all_coordinates", "/all-coordinates", {"format": "objects"}, rows),
+        ("all_coordinates", "/all-coordinates", {"format": "compact"}, rows),
+        ("export_image_csv", "/coordinates/export/bench-0", {}, rows // SYNTHETIC_IMAGES),
+        ("export_all_csv", "/coordinates/export", {}, rows),
+        ("export_all_csv_gzip", "/coordinates/export", {"gzip": "true"}, rows),
+    ]
+    results = []
+    for name, url, params, response_rows in targets:
+        result = {"benchmark": name, "params": {"rows": rows, **params}}
+        if response_rows > max_response_rows:
+            result["skipped"] = f"resposta com {response_rows} linhas (limite: --max-response-rows {max_response_rows})"
+            results.append(result)
+            continue
+        samples, size = [], 0
+        for _ in range(repeat):
+            elapsed, size = await timed_get(client, url, params)
+            samples.append(elapsed)
+        result["metrics"] = {"latency": latency_stats(samples), "bytes": size}
+        results.append(result)
+    return results
+
+async def bench_concurrent_saves(client, clients, saves_per_client):
+    """Vazão de POST /coordinates/{image_id} com clientes concorrentes"""
+    samples = []
+
+    async def worker(offset):
+        for i in range(saves_per_client):
+            start = time.perf_counter()
+            response = await client.post(
+                "/coordinates/bench-0",
+                json={"name": f"S-{offset + i}", "x": 0.5, "y": 0.5, "page": 1}
+            )
+            response.raise_for_status()
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n * saves_per_client) for n in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "benchmark": "concurrent_saves",
+        "params": {"clients": clients, "saves": len(samples)},
+        "metrics": {"saves_per_second": len(samples) / elapsed, "latency": latency_stats(samples)}
+    }
+
+async def run_suite(args):
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        session_id = None
+        for size in args.sizes:
+            for pages in args.pages:
+                pdf_path = make_pdf(pages, size)
+                print(f"Renderização e upload: {pages} páginas {size.upper()}")
+                results.append(await asyncio.to_thread(bench_render, pdf_path, pages, size))
+                session_id, upload = await bench_upload(client, pdf_path, pages, size)
+                results.append(upload)
+
+        if session_id:
+            print("Vazão de /images")
+            results.extend(await bench_images(client, session_id, args.image_requests, args.concurrency))
+
+        loaded = 0
+        for rows in sorted(args.rows):
+            print(f"Consultas de coordenadas: {rows} linhas")
+            start = time.perf_counter()
+            await asyncio.to_thread(load_coordinates, loaded, rows)
+            results.append({
+                "benchmark": "load_synthetic_coordinates",
+                "params": {"from_rows": loaded, "rows": rows},
+                "metrics": {"seconds": time.perf_counter() - start}
+            })
+            loaded = rows
+            results.extend(await bench_coordinate_queries(client, rows, args.max_response_rows, args.repeat))
+
+        print("Gravações concorrentes")
+        if not args.rows:
+            await asyncio.to_thread(load_coordinates, 0, 0)
+        for clients in args.clients:
+            results.append(await bench_concurrent_saves(client, clients, args.saves))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=PRESETS, default="quick")
+    parser.add_argument("--pages", type=int, nargs="+", help="números de páginas dos PDFs sintéticos")
+    parser.add_argument("--sizes", nargs="+", choices=PAGE_SIZES, help="tamanhos de página dos PDFs sintéticos")
+    parser.add_argument("--rows", type=int, nargs="+", help="tamanhos da tabela saved_coordinates")
+    parser.add_argument("--max-response-rows", type=int, default=1000000, help="não mede respostas maiores que isso")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições de cada consulta")
+    parser.add_argument("--image-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--saves", type=int, default=200, help="gravações por cliente")
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+    for key in ("pages", "sizes", "rows"):
+        if getattr(args, key) is None:
+            setattr(args, key, PRESETS[args.preset][key])
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    try:
+        results = asyncio.run(run_suite(args))
+    finally:
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "started_at": started_at,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "render_workers": RENDER_WORKERS,
+            "args": vars(args)
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {args.output}")
+
+if __name__ == "__main__":
+    main()
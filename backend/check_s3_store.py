@@ -0,0 +1,83 @@
+"""
+Verificação do armazenamento S3 (S3PageStore) contra um bucket real ou compatível (MinIO).
+
+Usa as variáveis S3_* e as credenciais do ambiente, grava sob um prefixo próprio e remove
+tudo ao final. Com o docker-compose (perfil "s3", MinIO local):
+    docker compose --profile s3 run --rm backend-s3 python check_s3_store.py
+"""
+import os
+import shutil
+import tempfile
+import urllib.request
+import uuid
+from app.core.config import S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION
+from app.services.page_store import S3PageStore
+from app.services.render_cache import RenderCache
+
+FILES = {
+    "documento.pdf": b"%PDF-1.4 verificacao\n" * 64,
+    "page_1.png": os.urandom(256 * 1024),
+    "page_1_thumbnail.jpg": os.urandom(4096)
+}
+
+def create_store(workdir, name, prefix):
+    """Um S3PageStore com área de upload e cache locais próprios, como uma réplica nova"""
+    cache = RenderCache(os.path.join(workdir, name, "cache"), 64 * 1024 * 1024)
+    return S3PageStore(S3_BUCKET, prefix, S3_ENDPOINT_URL, S3_REGION, os.path.join(workdir, name, "staging"), cache)
+
+def check(description, condition):
+    print(f"{'ok  ' if condition else 'FALHOU'} {description}")
+    return condition
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="check_s3_")
+    prefix = f"{S3_PREFIX}check-{uuid.uuid4().hex}/"
+    session_id = str(uuid.uuid4())
+    key = f"{session_id}/page_1.png"
+    writer = create_store(workdir, "writer", prefix)
+    results = []
+    try:
+        staging_dir = writer.staging_dir(session_id)
+        os.makedirs(staging_dir)
+        for name, content in FILES.items():
+            with open(os.path.join(staging_dir, name), "wb") as file:
+                file.write(content)
+
+        # Publicação: objetos no bucket, área de upload removida, cópias no cache local
+        writer.publish_session(session_id, staging_dir)
+        results.append(check("publish_session remove a área de upload", not os.path.exists(staging_dir)))
+        results.append(check("publish_session serve do cache local", writer.cache.get(key) is not None))
+
+        # Outra réplica: sem listagem em memória nem cache, lê do bucket
+        reader = create_store(workdir, "reader", prefix)
+        listing = reader.list_session(session_id)
+        results.append(check("list_session lista os objetos publicados", listing == {name: len(content) for name, content in FILES.items()}))
+        path = reader.local_path(key)
+        with open(path, "rb") as file:
+            results.append(check("local_path baixa o objeto (read-through)", file.read() == FILES["page_1.png"]))
+        results.append(check("local_path usa o cache na segunda leitura", reader.local_path(key) == path))
+        results.append(check("local_path de objeto inexistente retorna None", reader.local_path(f"{session_id}/page_9.png") is None))
+        results.append(check("local_path de sessão inválida retorna None", reader.local_path("../page_1.png") is None))
+
+        # URL pré-assinada acessível sem credenciais
+        url = reader.download_url(key)
+        with urllib.request.urlopen(url) as response:
+            results.append(check("download_url entrega o objeto", response.read() == FILES["page_1.png"]))
+        results.append(check("download_url de objeto inexistente retorna None", reader.download_url(f"{session_id}/page_9.png") is None))
+
+        usage = reader.usage().get(session_id)
+        results.append(check("usage conta a sessão", usage is not None and usage["files"] == len(FILES)))
+
+        # Remoção vista pelas duas réplicas
+        reader.delete_session(session_id)
+        results.append(check("delete_session remove os objetos", create_store(workdir, "after", prefix).list_session(session_id) == {}))
+        results.append(check("delete_session some do usage", session_id not in reader.usage()))
+    finally:
+        writer.delete_session(session_id)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{sum(results)}/{len(results)} verificações passaram")
+    return 0 if all(results) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,16 @@
 import os
-import sqlite3
 import shutil
+from app.core.config import DB_FILE
+from app.db.database import init_db
 
-# Remover o banco de dados existente
-db_file = "coordinates.db"
+# Remover o banco de dados existente (e os arquivos do WAL)
+db_file = DB_FILE
 if os.path.exists(db_file):
     print(f"Removendo banco de dados existente: {db_file}")
     os.remove(db_file)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
     print("Banco de dados removido com sucesso")
 else:
     print("Banco de dados não encontrado, será criado do zero")
@@ -22,40 +26,8 @@ else:
     os.makedirs(uploads_dir)
     print("Diretório de uploads criado")
 
-# Criar um novo banco de dados com a estrutura correta
+# Criar um novo banco de dados com a estrutura correta (aplicando todas as migrações)
 print(f"Criando novo banco de dados: {db_file}")
-conn = sqlite3.connect(db_file)
-cursor = conn.cursor()
+init_db()
 
-# Criar tabela para armazenar informações sobre as imagens processadas
-print("Criando tabela processed_images...")
-cursor.execute('''
-CREATE TABLE processed_images (
-    id TEXT PRIMARY KEY,
-    filename TEXT NOT NULL,
-    upload_date TEXT NOT NULL,
-    page_count INTEGER NOT NULL,
-    thumbnail_path TEXT
-)
-''')
-
-# Criar tabela para armazenar coordenadas salvas
-print("Criando tabela saved_coordinates...")
-cursor.execute('''
-CREATE TABLE saved_coordinates (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    image_id TEXT NOT NULL,
-    name TEXT NOT NULL,
-    x REAL NOT NULL,
-    y REAL NOT NULL,
-    page INTEGER NOT NULL,
-    created_at TEXT NOT NULL,
-    source TEXT,
-    FOREIGN KEY (image_id) REFERENCES processed_images (id)
-)
-''')
-
-conn.commit()
-conn.close()
-
-print("Novo banco de dados criado com sucesso") 
\ No newline at end of file
+print("Novo banco de dados criado com sucesso")
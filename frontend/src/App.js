@@ -1,5 +1,5 @@
 // App.js
-import React, { useState, useRef, useEffect } from 'react';
+import React, { useState, useEffect } from 'react';
 import OpenSeadragon from 'openseadragon';
 import './App.css';
 import { api } from './services/api';
@@ -46,12 +46,6 @@ function App() {
   const [imageHistory, setImageHistory] = useState([]);
   const [selectedImage, setSelectedImage] = useState(null);
   const [activeTab, setActiveTab] = useState('capture'); // 'capture' ou 'find'
-  const [allSavedCoordinates, setAllSavedCoordinates] = useState([]);
-  const [loadingAllCoordinates, setLoadingAllCoordinates] = useState(false);
-  const [searchTerm, setSearchTerm] = useState('');
-  const [searchResults, setSearchResults] = useState([]);
-  const [showSuggestions, setShowSuggestions] = useState(false);
-  const [filteredCoordinates, setFilteredCoordinates] = useState([]);
 
   const {
     viewerRef,
@@ -65,56 +59,11 @@ function App() {
     navigateToCoordinates
   } = useImageViewer(activeTab);
 
-  const searchInputRef = useRef(null);
-
   // Carrega o histórico de imagens
   useEffect(() => {
     fetchImageHistory();
-    fetchAllSavedCoordinates();
   }, []);
 
-  // Efeito para lidar com cliques fora do dropdown de sugestões
-  useEffect(() => {
-    const handleClickOutside = (event) => {
-      if (searchInputRef.current && !searchInputRef.current.contains(event.target)) {
-        setShowSuggestions(false);
-      }
-    };
-
-    document.addEventListener('mousedown', handleClickOutside);
-    return () => {
-      document.removeEventListener('mousedown', handleClickOutside);
-    };
-  }, []);
-
-  // Efeito para atualizar os resultados filtrados quando o termo de busca muda
-  useEffect(() => {
-    if (searchTerm.trim() === '') {
-      setFilteredCoordinates(allSavedCoordinates);
-      setSearchResults([]);
-      return;
-    }
-
-    const lowerCaseSearchTerm = searchTerm.toLowerCase();
-
-    // Filtrar coordenadas que correspondam ao termo de busca (no nome ou source)
-    const filtered = allSavedCoordinates.filter(coord =>
-      coord.name.toLowerCase().includes(lowerCaseSearchTerm) ||
-      (coord.source && coord.source.toLowerCase().includes(lowerCaseSearchTerm))
-    );
-
-    setFilteredCoordinates(filtered);
-
-    // Gerar sugestões de autocomplete (apenas nomes únicos)
-    const suggestions = Array.from(new Set(
-      allSavedCoordinates
-        .filter(coord => coord.name.toLowerCase().includes(lowerCaseSearchTerm))
-        .map(coord => coord.name)
-    )).slice(0, 10); // Limitar a 10 sugestões
-
-    setSearchResults(suggestions);
-  }, [searchTerm, allSavedCoordinates]);
-
   const fetchImageHistory = async () => {
     try {
       const data = await api.fetchImageHistory();
@@ -124,34 +73,6 @@ function App() {
     }
   };
 
-  // Carrega todas as coordenadas salvas
-  const fetchAllSavedCoordinates = async () => {
-    setLoadingAllCoordinates(true);
-    try {
-      console.log('Buscando todas as coordenadas salvas...');
-      const data = await api.fetchAllSavedCoordinates();
-      console.log(`Encontradas ${data.length} coordenadas salvas`);
-      setAllSavedCoordinates(data);
-      setFilteredCoordinates(data);
-    } catch (error) {
-      console.error('Erro ao carregar todas as coordenadas:', error);
-    } finally {
-      setLoadingAllCoordinates(false);
-    }
-  };
-
-  // Função para selecionar uma sugestão do autocomplete
-  const handleSelectSuggestion = (suggestion) => {
-    setSearchTerm(suggestion);
-    setShowSuggestions(false);
-
-    // Filtrar para mostrar apenas os pontos com esse nome exato
-    const exactMatches = allSavedCoordinates.filter(
-      coord => coord.name.toLowerCase() === suggestion.toLowerCase()
-    );
-    setFilteredCoordinates(exactMatches);
-  };
-
   // Carrega as coordenadas salvas para uma imagem
   const fetchSavedCoordinates = async (imageId) => {
     try {
@@ -200,7 +121,7 @@ function App() {
         viewerInstance.current = null;
       }
 
-      initializeViewer(currentPageData.path);
+      initializeViewer(currentPageData.path, currentPageData);
 
       // Adiciona manipulador de evento para capturar coordenadas do mouse apenas na aba "capturar"
       if (activeTab === 'capture') {
@@ -1,12 +1,16 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { api } from '../services/api';
 
+const PAGE_SIZE = 50;
+
 export const CoordinateSearch = ({ onNavigate }) => {
   const [searchTerm, setSearchTerm] = useState('');
   const [searchResults, setSearchResults] = useState([]);
   const [showSuggestions, setShowSuggestions] = useState(false);
   const [filteredCoordinates, setFilteredCoordinates] = useState([]);
-  const [loadingAllCoordinates, setLoadingAllCoordinates] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [activeFilters, setActiveFilters] = useState({});
+  const [loadingCoordinates, setLoadingCoordinates] = useState(false);
   const searchInputRef = useRef(null);
 
   useEffect(() => {
@@ -22,49 +26,54 @@ export const CoordinateSearch = ({ onNavigate }) => {
     };
   }, []);
 
+  // Busca no servidor uma página de coordenadas filtradas (cursor = continuação)
+  const loadCoordinates = async (filters, cursor = null) => {
+    setLoadingCoordinates(true);
+    try {
+      const data = await api.fetchCoordinatesPage({ ...filters, cursor, limit: PAGE_SIZE });
+      setFilteredCoordinates(previous => (cursor ? [...previous, ...data.items] : data.items));
+      setNextCursor(data.next_cursor);
+      setActiveFilters(filters);
+      return data.items;
+    } catch (error) {
+      console.error('Erro ao carregar coordenadas:', error);
+      return [];
+    } finally {
+      setLoadingCoordinates(false);
+    }
+  };
+
+  // Busca full-text no servidor (nome ou fonte) depois que o usuário para de digitar
   useEffect(() => {
     if (searchTerm.trim() === '') {
       setFilteredCoordinates([]);
       setSearchResults([]);
+      setNextCursor(null);
       return;
     }
 
-    const lowerCaseSearchTerm = searchTerm.toLowerCase();
-
-    const filtered = filteredCoordinates.filter(coord =>
-      coord.name.toLowerCase().includes(lowerCaseSearchTerm) ||
-      (coord.source && coord.source.toLowerCase().includes(lowerCaseSearchTerm))
-    );
-
-    const suggestions = Array.from(new Set(
-      filteredCoordinates
-        .filter(coord => coord.name.toLowerCase().includes(lowerCaseSearchTerm))
-        .map(coord => coord.name)
-    )).slice(0, 10);
+    const timeout = setTimeout(async () => {
+      setLoadingCoordinates(true);
+      try {
+        const items = await api.searchCoordinates(searchTerm.trim(), { limit: PAGE_SIZE });
+        setFilteredCoordinates(items);
+        setNextCursor(null);
+        setSearchResults(Array.from(new Set(items.map(coord => coord.name))).slice(0, 10));
+      } catch (error) {
+        console.error('Erro ao buscar coordenadas:', error);
+      } finally {
+        setLoadingCoordinates(false);
+      }
+    }, 250);
 
-    setSearchResults(suggestions);
-  }, [searchTerm, filteredCoordinates]);
+    return () => clearTimeout(timeout);
+  }, [searchTerm]);
 
-  const handleSelectSuggestion = (suggestion) => {
-    setSearchTerm(suggestion);
+  const handleSelectSuggestion = async (suggestion) => {
     setShowSuggestions(false);
 
-    const exactMatches = filteredCoordinates.filter(
-      coord => coord.name.toLowerCase() === suggestion.toLowerCase()
-    );
-    setFilteredCoordinates(exactMatches);
-  };
-
-  const loadAllCoordinates = async () => {
-    setLoadingAllCoordinates(true);
-    try {
-      const data = await api.fetchAllSavedCoordinates();
-      setFilteredCoordinates(data);
-    } catch (error) {
-      console.error('Erro ao carregar coordenadas:', error);
-    } finally {
-      setLoadingAllCoordinates(false);
-    }
+    // Filtra pelo nome sugerido
+    await loadCoordinates({ name: suggestion });
   };
 
   return (
@@ -74,10 +83,7 @@ export const CoordinateSearch = ({ onNavigate }) => {
           type="text"
           value={searchTerm}
           onChange={(e) => setSearchTerm(e.target.value)}
-          onFocus={() => {
-            setShowSuggestions(true);
-            loadAllCoordinates();
-          }}
+          onFocus={() => setShowSuggestions(true)}
           placeholder="Buscar coordenadas..."
         />
         {showSuggestions && searchResults.length > 0 && (
@@ -108,8 +114,16 @@ export const CoordinateSearch = ({ onNavigate }) => {
               </li>
             ))}
           </ul>
+          {nextCursor && (
+            <button
+              disabled={loadingCoordinates}
+              onClick={() => loadCoordinates(activeFilters, nextCursor)}
+            >
+              {loadingCoordinates ? 'Carregando...' : 'Carregar mais'}
+            </button>
+          )}
         </div>
       )}
     </div>
   );
-}; 
\ No newline at end of file
+};
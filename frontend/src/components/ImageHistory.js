@@ -1,4 +1,5 @@
 import React from 'react';
+import { SERVER_URL } from '../config/server';
 
 export const ImageHistory = ({
     historyOpen,
@@ -26,8 +27,20 @@ export const ImageHistory = ({
                                 className={selectedImage?.id === image.id ? 'selected' : ''}
                                 onClick={() => onImageSelect(image)}
                             >
-                                <span>{image.filename}</span>
-                                <span>{new Date(image.upload_date).toLocaleString()}</span>
+                                <div className="history-item">
+                                    {image.thumbnail_path && (
+                                        <img
+                                            className="history-thumbnail"
+                                            src={`${SERVER_URL}${image.thumbnail_path}`}
+                                            alt={image.filename}
+                                            loading="lazy"
+                                        />
+                                    )}
+                                    <div className="history-info">
+                                        <p className="history-filename">{image.filename}</p>
+                                        <p className="history-date">{new Date(image.upload_date).toLocaleString()}</p>
+                                    </div>
+                                </div>
                             </li>
                         ))}
                     </ul>
@@ -1,6 +1,7 @@
 import { useState, useRef, useEffect } from 'react';
 import OpenSeadragon from 'openseadragon';
 import { SERVER_URL } from '../config/server';
+import { api } from '../services/api';
 
 export const useImageViewer = (activeTab) => {
     const [overlay, setOverlay] = useState(null);
@@ -30,7 +31,41 @@ export const useImageViewer = (activeTab) => {
         }
     };
 
-    const initializeViewer = (imageUrl) => {
+    // Imagem inteira em resolução completa (páginas sem pirâmide de tiles ou se /info falhar)
+    const buildImageSource = (imageUrl) => ({
+        type: 'image',
+        url: `${SERVER_URL}${imageUrl}`,
+        buildPyramid: false
+    });
+
+    // Pirâmide de tiles descrita pelo backend: tamanho do tile e dimensões vêm de /info,
+    // para acompanhar o TILE_SIZE configurado no servidor
+    const buildTileSource = (info) => ({
+        width: info.width,
+        height: info.height,
+        tileSize: info.tileSize,
+        tileOverlap: info.tileOverlap,
+        minLevel: info.minLevel,
+        maxLevel: info.maxLevel,
+        getTileUrl: (level, x, y) => `${SERVER_URL}${info.tiles}/${level}/${x}/${y}`
+    });
+
+    const openPage = async (viewer, imageUrl, page) => {
+        let tileSource = buildImageSource(imageUrl);
+        if (page?.tiles) {
+            try {
+                tileSource = buildTileSource(await api.fetchTileInfo(page.tiles));
+            } catch (error) {
+                console.error('Erro ao buscar informações dos tiles:', error);
+            }
+        }
+        // A página pode ter sido trocada enquanto /info respondia
+        if (viewerInstance.current === viewer) {
+            viewer.open(tileSource);
+        }
+    };
+
+    const initializeViewer = (imageUrl, page) => {
         if (viewerInstance.current) {
             clearAllMarkers();
             viewerInstance.current.destroy();
@@ -39,11 +74,6 @@ export const useImageViewer = (activeTab) => {
 
         viewerInstance.current = OpenSeadragon({
             id: "openseadragon-viewer",
-            tileSources: {
-                type: 'image',
-                url: `${SERVER_URL}${imageUrl}`,
-                buildPyramid: false
-            },
             showNavigationControl: true,
             navigatorPosition: "BOTTOM_RIGHT",
             zoomInButton: "zoom-in",
@@ -55,6 +85,7 @@ export const useImageViewer = (activeTab) => {
             visibilityRatio: 1,
             constrainDuringPan: true
         });
+        openPage(viewerInstance.current, imageUrl, page);
 
         if (activeTab === 'capture') {
             viewerInstance.current.addHandler('canvas-click', function (event) {
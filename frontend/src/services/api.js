@@ -11,9 +11,63 @@ export const api = {
         return response.json();
     },
 
-    // Buscar todas as coordenadas salvas
-    async fetchAllSavedCoordinates() {
-        const response = await fetch(`${SERVER_URL}/all-coordinates`);
+    // Buscar uma página de coordenadas com filtros no servidor (q, name, source, image_id, page)
+    async fetchCoordinatesPage({ cursor, limit = 50, ...filters } = {}) {
+        const params = new URLSearchParams({ limit });
+        if (cursor) params.set('cursor', cursor);
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') params.set(key, value);
+        });
+        const response = await fetch(`${SERVER_URL}/coordinates?${params}`);
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => null);
+            throw new Error(errorData?.detail || `Erro ${response.status}: ${response.statusText}`);
+        }
+        return response.json();
+    },
+
+    // Busca full-text por nome ou fonte (resultados por relevância)
+    async searchCoordinates(q, { imageId, page, limit = 50 } = {}) {
+        const params = new URLSearchParams({ q, limit });
+        if (imageId) params.set('image_id', imageId);
+        if (page) params.set('page', page);
+        const response = await fetch(`${SERVER_URL}/search/coordinates?${params}`);
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => null);
+            throw new Error(errorData?.detail || `Erro ${response.status}: ${response.statusText}`);
+        }
+        return response.json();
+    },
+
+    // Buscar coordenadas de uma página dentro de um retângulo (viewport)
+    async fetchCoordinatesInRegion(imageId, page, { x0, y0, x1, y1 }, limit = 5000) {
+        const params = new URLSearchParams({ page, x0, y0, x1, y1, limit });
+        const response = await fetch(`${SERVER_URL}/coordinates/${imageId}/region?${params}`);
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => null);
+            throw new Error(errorData?.detail || `Erro ${response.status}: ${response.statusText}`);
+        }
+        return response.json();
+    },
+
+    // Buscar as coordenadas mais próximas de um ponto
+    async fetchNearestCoordinates(imageId, page, { x, y }, { k = 1, maxDistance } = {}) {
+        const params = new URLSearchParams({ page, x, y, k });
+        if (maxDistance) params.set('max_distance', maxDistance);
+        const response = await fetch(`${SERVER_URL}/coordinates/${imageId}/nearest?${params}`);
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => null);
+            throw new Error(errorData?.detail || `Erro ${response.status}: ${response.statusText}`);
+        }
+        return response.json();
+    },
+
+    // Buscar palavras no texto dos PDFs (tags, números de equipamento)
+    async searchText(q, { imageId, page, prefix = true, limit = 50 } = {}) {
+        const params = new URLSearchParams({ q, prefix, limit });
+        if (imageId) params.set('image_id', imageId);
+        if (page) params.set('page', page);
+        const response = await fetch(`${SERVER_URL}/search/text?${params}`);
         if (!response.ok) {
             const errorData = await response.json().catch(() => null);
             throw new Error(errorData?.detail || `Erro ${response.status}: ${response.statusText}`);
@@ -57,6 +111,16 @@ export const api = {
         return response.blob();
     },
 
+    // Descrição da pirâmide de tiles de uma página (dimensões, tileSize, níveis)
+    async fetchTileInfo(tilesPath) {
+        const response = await fetch(`${SERVER_URL}${tilesPath}/info`);
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => null);
+            throw new Error(errorData?.detail || `Erro ${response.status}: ${response.statusText}`);
+        }
+        return response.json();
+    },
+
     // Deletar uma coordenada
     async deleteCoordinate(id) {
         const response = await fetch(`${SERVER_URL}/coordinates/${id}`, {